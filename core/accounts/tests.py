@@ -1,3 +1,34 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+
+class AuthQueryTests(TestCase):
+    """Login and logout stay at a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username='admin', password='secret', email='admin@example.com')
+
+    def login(self):
+        return self.client.post(
+            '/api/accounts/login/', {'username': 'admin', 'password': 'secret'}, content_type='application/json'
+        )
+
+    def test_login(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(context.captured_queries), 3)
+
+    def test_logout(self):
+        tokens = self.login().json()['data']['tokens']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/accounts/logout/', {'refresh': tokens['refresh']}, content_type='application/json',
+                HTTP_AUTHORIZATION=f"Bearer {tokens['access']}"
+            )
+        self.assertEqual(response.status_code, 200)
+        # user, blacklist checks and the get_or_create of the blacklist row
+        self.assertLessEqual(len(context.captured_queries), 8)
@@ -1,7 +1,12 @@
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
 from api.models import Category, Product, ProductImage, Size
 from api.serializers import ProductImageSerializer, ProductSerializer, CategorySerializer, SizeSerializer
-from django.core.cache import cache
+from api.services.image_pipeline import create_product_images
 
 class CompositionSeriallizer(serializers.ModelSerializer):
     class Meta:
@@ -24,8 +29,7 @@ class AdminCategorySerializer(serializers.ModelSerializer):
         if image_file:
             category.image = image_file
             category.save()
-            
-        cache.delete('categories')
+
         return category
 
     def update(self, instance, validated_data):
@@ -38,7 +42,6 @@ class AdminCategorySerializer(serializers.ModelSerializer):
             instance.image = image_file
             
         instance.save()
-        cache.delete('categories')
         return instance
     
     def get_image(self, obj):
@@ -51,6 +54,39 @@ class AdminCategorySerializer(serializers.ModelSerializer):
 
 
 
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Resolves every submitted primary key with one IN query instead of one query each"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        try:
+            keys = [pk_field.to_python(value) for value in data]
+        except DjangoValidationError:
+            child.fail('incorrect_type', data_type=type(data).__name__)
+        objects = queryset.in_bulk(keys)
+        for value, key in zip(data, keys):
+            if key not in objects:
+                child.fail('does_not_exist', pk_value=value)
+        return [objects[key] for key in keys]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
@@ -62,15 +98,66 @@ class ProductImageSerializer(serializers.ModelSerializer):
         return data
 
 
+class AdminProductFilterSerializer(serializers.Serializer):
+    """
+    Validates the query params accepted by the admin product list.
+    """
+    ORDERING_CHOICES = ['-created_at', 'created_at', '-updated_at', 'price', '-price', 'title', '-title']
+
+    search = serializers.CharField(required=False, allow_blank=True, max_length=50)
+    category = serializers.UUIDField(required=False)
+    ordering = serializers.ChoiceField(choices=ORDERING_CHOICES, required=False, default='-created_at')
+
+    def get_queryset_filters(self):
+        filters = {}
+        if self.validated_data.get('search'):
+            filters['title__icontains'] = self.validated_data['search'].strip()
+        if 'category' in self.validated_data:
+            filters['category_id'] = self.validated_data['category']
+        return filters
+
+
+class AdminOrderFilterSerializer(serializers.Serializer):
+    """
+    Validates the query params accepted by the admin order list.
+    """
+    ORDERING_CHOICES = ['-created_at', 'created_at']
+
+    # default=None keeps a missing param from reading as False
+    is_confirmed = serializers.BooleanField(required=False, allow_null=True, default=None)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    ordering = serializers.ChoiceField(choices=ORDERING_CHOICES, required=False, default='-created_at')
+
+    def validate(self, data):
+        if 'date_from' in data and 'date_to' in data and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError("date_from cannot be after date_to.")
+        return data
+
+    @staticmethod
+    def start_of(date):
+        return timezone.make_aware(datetime.combine(date, time.min))
+
+    def get_queryset_filters(self):
+        # Plain datetime bounds (not created_at__date) so the index is used
+        filters = {}
+        if self.validated_data.get('is_confirmed') is not None:
+            filters['is_confirmed'] = self.validated_data['is_confirmed']
+        if 'date_from' in self.validated_data:
+            filters['created_at__gte'] = self.start_of(self.validated_data['date_from'])
+        if 'date_to' in self.validated_data:
+            filters['created_at__lt'] = self.start_of(self.validated_data['date_to'] + timedelta(days=1))
+        return filters
+
+
 class AdminProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, required=False)
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=False)
-    size = serializers.PrimaryKeyRelatedField(queryset=Size.objects.all(), many=True)
+    size = BulkPrimaryKeyRelatedField(queryset=Size.objects.all(), many=True)
 
     class Meta:
         model = Product
         fields = ['id', 'title', 'images', 'category', 'size', 'price', 'description']
-    # when it is called delete the cache
 
     def create(self, validated_data):
         images_data = validated_data.pop('images', [])
@@ -79,12 +166,8 @@ class AdminProductSerializer(serializers.ModelSerializer):
         product = Product.objects.create(**validated_data)
         product.size.set(size_data)
 
-        for image_data in images_data:
-            product_image = ProductImage.objects.create(**image_data)
-            product.images.add(product_image)
-        
-        # delete the cache
-        cache.delete('products')
+        create_product_images(product, images_data)
+
         return product
 
     def update(self, instance, validated_data):
@@ -100,9 +183,7 @@ class AdminProductSerializer(serializers.ModelSerializer):
         if images_data is not None:
             # Clear old images and add new ones
             instance.images.clear()
-            for image_data in images_data:
-                image = ProductImage.objects.create(**image_data)
-                instance.images.add(image)
+            create_product_images(instance, images_data)
 
         instance.save()
         return instance
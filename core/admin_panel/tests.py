@@ -1,3 +1,157 @@
-from django.test import TestCase
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.test.client import MULTIPART_CONTENT, BOUNDARY, encode_multipart
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Order, Product
+from api.services.catalog_export import CatalogExporter
+from api.tests import QueryBudgetMixin
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class AdminEndpointQueryTests(QueryBudgetMixin, TestCase):
+    """Every admin request also spends one query loading the JWT user"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user(username='admin', password='secret', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_categories(self):
+        self.get('/api/admin/categories/', 2, **self.auth)
+
+    def test_products(self):
+        response = self.get('/api/admin/products/?page_size=100', 5, **self.auth)
+        data = response.json()
+        self.assertEqual(data['count'], self.PRODUCTS)
+        self.assertEqual(len(data['products']), 100)
+        # Deep pages cost the same as the first one; the last page also
+        # reads the (empty) tail of products without created_at
+        seen = {product['id'] for product in data['products']}
+        while data['has_more']:
+            data = self.get(f"/api/admin/products/?page_size=100&cursor={data['next_cursor']}", 6, **self.auth).json()
+            seen.update(product['id'] for product in data['products'])
+        self.assertEqual(len(seen), self.PRODUCTS)
+
+    def test_products_search_and_sort(self):
+        response = self.get('/api/admin/products/?search=product 1&ordering=title', 5, **self.auth)
+        titles = [product['title'] for product in response.json()['products']]
+        self.assertTrue(titles)
+        self.assertTrue(all('Product 1' in title for title in titles))
+        self.assertEqual(titles, sorted(titles))
+
+    def test_products_invalid_filters(self):
+        response = self.client.get('/api/admin/products/?ordering=id', **self.auth)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/admin/products/?cursor=garbage', **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_products_in_category(self):
+        response = self.get(f'/api/admin/categorised-products/{self.categories[0].id}/', 5, **self.auth)
+        self.assertEqual(response.json()['count'], self.PRODUCTS // self.CATEGORIES)
+
+    def test_product_detail(self):
+        self.get(f'/api/admin/products/{self.products[0].id}/', 5, **self.auth)
+
+    def test_create_product_with_images(self):
+        data = {
+            'title': 'New product', 'description': 'Linen', 'price': '900',
+            'category': str(self.categories[0].id),
+            'size': [str(size.id) for size in self.sizes],
+        }
+        for index in range(5):
+            data[f'images[{index}][image_url]'] = f'https://cdn.example.com/new-{index}.jpg'
+        with self.assertMaxQueries(14):
+            response = self.client.post('/api/admin/products/', data, **self.auth)
+        self.assertEqual(response.status_code, 201, response.content[:500])
+
+    def test_create_product_exports_once(self):
+        data = {
+            'title': 'New product', 'description': 'Linen', 'price': '900',
+            'category': str(self.categories[0].id),
+            'size': [str(size.id) for size in self.sizes],
+            'images[0][image_url]': 'https://cdn.example.com/new.jpg',
+        }
+        root = self.enterContext(TemporaryDirectory())
+        with override_settings(CATALOG_SNAPSHOTS=True, CATALOG_SNAPSHOT_ROOT=root), \
+                mock.patch.object(CatalogExporter, 'export_products', autospec=True) as export_products:
+            response = self.client.post('/api/admin/products/', data, **self.auth)
+        self.assertEqual(response.status_code, 201, response.content[:500])
+        # Product save, size add and image add are merged into one export
+        export_products.assert_called_once()
+        self.assertEqual(export_products.call_args.args[1], {response.json()['id']})
+
+    def test_create_product_with_unknown_size(self):
+        data = {
+            'title': 'New product', 'description': 'Linen', 'price': '900',
+            'category': str(self.categories[0].id),
+            'size': [str(self.sizes[0].id), '00000000-0000-0000-0000-000000000000', 'not-a-uuid'],
+        }
+        response = self.client.post('/api/admin/products/', data, **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('size', response.json())
+
+    def test_update_product_images(self):
+        product = self.products[0]
+        urls = [image.image_url for image in product.images.all() if image.image_url]
+        urls += [f'https://cdn.example.com/extra-{i}.jpg' for i in range(5)]
+        data = {'title': 'Renamed'}
+        for index, url in enumerate(urls):
+            data[f'images[{index}][image_url]'] = url
+        with self.assertMaxQueries(18):
+            response = self.client.put(
+                f'/api/admin/products/{product.id}/',
+                encode_multipart(BOUNDARY, data), content_type=MULTIPART_CONTENT, **self.auth
+            )
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertEqual(Product.objects.get(id=product.id).images.count(), len(urls))
+
+    def test_sizes(self):
+        self.get('/api/admin/sizes/', 2, **self.auth)
+
+    def test_contact_messages(self):
+        self.get('/api/admin/contact-us/', 2, **self.auth)
+
+    def test_orders(self):
+        response = self.get('/api/admin/orders/?page_size=10', 6, **self.auth)
+        data = response.json()
+        self.assertEqual(data['count'], self.ORDERS)
+        seen = [order['id'] for order in data['data']]
+        while data['has_more']:
+            data = self.get(f"/api/admin/orders/?page_size=10&cursor={data['next_cursor']}", 6, **self.auth).json()
+            seen += [order['id'] for order in data['data']]
+        self.assertEqual(len(set(seen)), self.ORDERS)
+
+    def test_orders_filtered_by_status_and_date(self):
+        Order.objects.filter(id__in=[order.id for order in self.orders[:5]]).update(is_confirmed=True)
+        today = timezone.localdate()
+        response = self.get(f'/api/admin/orders/?is_confirmed=true&date_from={today}&date_to={today}', 6, **self.auth)
+        self.assertEqual(response.json()['count'], 5)
+        response = self.get('/api/admin/orders/?is_confirmed=false', 6, **self.auth)
+        self.assertEqual(response.json()['count'], self.ORDERS - 5)
+        response = self.get(f'/api/admin/orders/?date_from={today + timedelta(days=1)}', 3, **self.auth)
+        self.assertEqual(response.json()['count'], 0)
+        response = self.client.get(f'/api/admin/orders/?date_from={today}&date_to={today - timedelta(days=1)}', **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_order_detail(self):
+        self.get(f'/api/admin/orders/{self.orders[0].id}/', 5, **self.auth)
+
+    def test_team(self):
+        self.get('/api/admin/stuff/', 2, **self.auth)
+
+    def test_reviews(self):
+        self.get('/api/admin/reviews/', 2, **self.auth)
+
+    def test_metrics(self):
+        self.get('/api/admin/metrics/', 1, **self.auth)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import CategoryView, ProductListCreate,SizeView,ContactUsView,OrderView,ProductDetailView,StuffView,ReviewView
+from .views import CategoryView, ProductListCreate,SizeView,ContactUsView,OrderView,ProductDetailView,StuffView,ReviewView,MetricsView
 
 urlpatterns = [
     path('categories/', CategoryView.as_view(), name='category-get-post'),
@@ -17,4 +17,5 @@ urlpatterns = [
     path('stuff/<uuid:pk>/', StuffView.as_view(), name='update-delete-stuff'),
     path('reviews/', ReviewView.as_view(), name='Get-Post-reviews'),
     path('reviews/<uuid:pk>/', ReviewView.as_view(), name='update-delete-reviews'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
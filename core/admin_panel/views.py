@@ -2,13 +2,18 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import AdminCategorySerializer, AdminProductSerializer,SizeSerializer,ProductDetailSerializer
+from .serializers import AdminCategorySerializer, AdminProductSerializer, AdminProductFilterSerializer, AdminOrderFilterSerializer, SizeSerializer,ProductDetailSerializer
 from django.http import Http404
 from api.models import Category, Product, Size,ContactUs,Order,OrderItem,ProductImage,Stuff,Review
 from api.serializers import ContactUsSerializer, OrderItemSerializer,OrderSerializer,StuffSerializers,ReviewSerializer
 import re
 
 from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from api.services.image_pipeline import create_product_images
+from api.services.metrics import registry
+from api.pagination import KeysetPaginator, InvalidCursor, get_page_size
+from django.http import HttpResponse
 
 
 # Create your views here.
@@ -17,8 +22,6 @@ from rest_framework import permissions
 from rest_framework import viewsets
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 import json
-from django.core.cache import cache
-from api.views import CategoryList
 
 
     
@@ -151,11 +154,6 @@ class CategoryView(APIView):
 
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
-    def invalidate_category_cache(self):
-        """Helper method to invalidate category cache"""
-        cache_key = CategoryList.get_cache_key(CategoryList())
-        cache.delete(cache_key)
-
     def get(self, request):
         """
         Retrieve a list of all categories.
@@ -189,7 +187,6 @@ class CategoryView(APIView):
 
         if serializer.is_valid():
             serializer.save()
-            self.invalidate_category_cache()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -215,7 +212,6 @@ class CategoryView(APIView):
 
         if serializer.is_valid():
             serializer.save()
-            self.invalidate_category_cache()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -232,7 +228,6 @@ class CategoryView(APIView):
         try:
             category = Category.objects.get(pk=pk)
             category.delete()
-            self.invalidate_category_cache()
             return Response(
                 {
                     'status': True,
@@ -252,16 +247,49 @@ class ProductListCreate(APIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
-    def invalidate_product_cache(self):
-        cache.delete('product_list')
-
     def get(self, request, pk=None):
+        """
+        Products one page at a time, with a constant number of queries.
+
+        Query params:
+        - page_size: products per page (DEFAULT_PAGE_SIZE, capped at MAX_PAGE_SIZE)
+        - cursor: the next_cursor value returned with the previous page
+        - search: case-insensitive match on the title
+        - category: category id (or use categorised-products/<pk>/)
+        - ordering: -created_at (default), created_at, -updated_at, price, -price, title or -title
+        """
+        filters = AdminProductFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response({
+                'status': 'error',
+                'message': 'Invalid filters provided',
+                'errors': filters.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        products = Product.objects.filter(**filters.get_queryset_filters())
         if pk:
-            products = Product.objects.filter(category_id=pk)
-        else:
-            products = Product.objects.all().order_by('-created_at')
+            products = products.filter(category_id=pk)
+        count = products.count()
+        # Every row serializes its images and size ids
+        products = products.prefetch_related('images', 'size')
+
+        paginator = KeysetPaginator(filters.validated_data['ordering'])
+        try:
+            products, next_cursor = paginator.paginate(
+                products, request.query_params.get('cursor') or None, get_page_size(request)
+            )
+        except InvalidCursor as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = AdminProductSerializer(products, many=True)
-        return Response(serializer.data)
+        return Response({
+            'status': 'success',
+            'message': 'Products fetched successfully',
+            'products': serializer.data,
+            'count': count,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+        })
 
     def post(self, request):
         product_data = {
@@ -294,7 +322,6 @@ class ProductListCreate(APIView):
         serializer = AdminProductSerializer(data=combined_data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
-            self.invalidate_product_cache()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -303,29 +330,6 @@ class ProductDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
     
-    def invalidate_product_cache(self):
-        # Clear the main product list cache
-        cache.delete('product_list')
-        
-        # Clear category-specific product lists
-        categories = Category.objects.all()
-        for category in categories:
-            cache.delete(f'product_list_category_{category.id}')
-            
-        # Clear individual product caches
-        products = Product.objects.all()
-        for product in products:
-            cache.delete(f'product_detail_{product.id}')
-            
-        # Clear any other product-related caches
-        # Note: We can't use delete_pattern with LocMemCache
-        # Instead, we'll clear specific known cache keys
-        cache.delete('products')
-        cache.delete('all_products')
-        cache.delete('featured_products')
-        cache.delete('latest_products')
-        cache.delete('category_products')
-
     def get_object(self, pk):
         try:
             return Product.objects.get(pk=pk)
@@ -365,63 +369,55 @@ class ProductDetailView(APIView):
             # First, get all existing image IDs that should be kept
             existing_image_ids = set()
             
-            # Keep track of which images we're updating
-            is_updating_images = False
-            
-            # Process image URLs
+            # Collect image URLs
+            image_urls = []
             i = 0
             while True:
                 image_url = request.data.get(f'images[{i}][image_url]')
                 if not image_url:
                     break
-                    
-                is_updating_images = True
-                # Check if this URL already exists in the product's images
-                existing_image = product.images.filter(image_url=image_url).first()
-                if existing_image:
-                    existing_image_ids.add(existing_image.id)
-                else:
-                    try:
-                        # Create new image entry for new URL
-                        img = ProductImage.objects.create(
-                            image_url=image_url
-                        )
-                        product.images.add(img)
-                        existing_image_ids.add(img.id)
-                    except ValidationError as e:
-                        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                image_urls.append(image_url)
                 i += 1
 
-            # Process new image files
+            # Collect new image files
+            image_files = []
             i = 0
             while True:
                 image_file = request.FILES.get(f'images[{i}][image]')
                 if not image_file:
                     break
-                    
-                is_updating_images = True
-                try:
-                    # Create new image entry for new file
-                    img = ProductImage.objects.create(
-                        image=image_file
-                    )
-                    product.images.add(img)
-                    existing_image_ids.add(img.id)
-                except ValidationError as e:
-                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                image_files.append(image_file)
                 i += 1
 
+            is_updating_images = bool(image_urls or image_files)
+
+            # Keep images whose URL is already attached to the product
+            known_urls = {}
+            for img in product.images.filter(image_url__in=image_urls):
+                known_urls[img.image_url] = img.id
+            existing_image_ids.update(known_urls.values())
+
+            # Create every new image with one INSERT and one M2M add
+            new_images = [
+                {'image_url': image_url}
+                for image_url in dict.fromkeys(image_urls) if image_url not in known_urls
+            ] + [{'image': image_file} for image_file in image_files]
+            try:
+                created = create_product_images(product, new_images)
+            except ValidationError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            existing_image_ids.update(img.id for img in created)
+
             # Only delete images if we're explicitly updating images
             if is_updating_images:
-                # Keep all existing images that weren't part of this update
-                existing_images = product.images.all()
-                for img in existing_images:
-                    if img.id not in existing_image_ids:
-                        # Only delete if this image wasn't part of the update
-                        img.delete()
-
-            # Invalidate cache after all updates are complete
-            self.invalidate_product_cache()
+                # Detach existing images that weren't part of this update
+                removed = [img for img in product.images.all() if img.id not in existing_image_ids]
+                product.images.remove(*removed)
+                # Images are shared by content hash: only delete rows that
+                # no other product still uses
+                ProductImage.objects.filter(
+                    id__in=[img.id for img in removed], product_images__isnull=True
+                ).delete()
 
             serializer = ProductDetailSerializer(product)
             return Response(serializer.data, status=200)
@@ -434,7 +430,6 @@ class ProductDetailView(APIView):
         if not product:
             return Response({'error': 'Product not found'}, status=404)
         product.delete()
-        self.invalidate_product_cache()  # Invalidate cache after deletion
         return Response({'detail': 'Product deleted'}, status=204)
 
 
@@ -467,10 +462,14 @@ class OrderView(APIView):
 
     def get(self, request, pk=None):
         """
-        Retrieve all inquiries or a specific inquiry by ID User must be authenticated.
+        Retrieve a page of inquiries or a specific inquiry by ID User must be authenticated.
         
         Parameters:
         - inquiry_id: Optional. If provided, fetch the specific inquiry.
+        - page_size / cursor: page through the list with next_cursor
+        - is_confirmed: true or false
+        - date_from / date_to: YYYY-MM-DD, both inclusive
+        - ordering: -created_at (default) or created_at
         
         Returns:
         - Success: Inquiry details or list of inquiries
@@ -478,7 +477,7 @@ class OrderView(APIView):
         """
         if pk:
             # Fetch a specific inquiry
-            order = get_object_or_404(Order, id=pk)
+            order = get_object_or_404(OrderSerializer.setup_eager_loading(Order.objects.all()), id=pk)
             serializer = OrderSerializer(order)
             return Response({
                 "status": True,
@@ -486,13 +485,35 @@ class OrderView(APIView):
                 "data": serializer.data
             }, status=status.HTTP_200_OK)
         else:
-            # Fetch all inquiries
-            orders = Order.objects.all().order_by('-created_at')
+            # One page of orders, newest first by default
+            filters = AdminOrderFilterSerializer(data=request.query_params)
+            if not filters.is_valid():
+                return Response({
+                    "status": False,
+                    "message": "Invalid filters provided",
+                    "errors": filters.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            orders = Order.objects.filter(**filters.get_queryset_filters())
+            count = orders.count()
+            paginator = KeysetPaginator(filters.validated_data['ordering'])
+            try:
+                orders, next_cursor = paginator.paginate(
+                    OrderSerializer.setup_eager_loading(orders),
+                    request.query_params.get('cursor') or None,
+                    get_page_size(request)
+                )
+            except InvalidCursor as e:
+                return Response({"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             serializer = OrderSerializer(orders, many=True)
             return Response({
                 "status": True,
                 "message": "All inquiries fetched successfully",
-                "data": serializer.data
+                "data": serializer.data,
+                "count": count,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
             }, status=status.HTTP_200_OK)
         
 
@@ -610,4 +631,15 @@ class ReviewView(APIView):
         return Response({
             'status': 'success',
             'message': 'Review deleted successfully'
-        }, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        }, status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricsView(APIView):
+    '''
+    staff only. use access_token: Bearer <token>
+    get: per-endpoint latency, query count, serializer time and cache
+    hit/miss metrics of this worker process, in the Prometheus text format
+    '''
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
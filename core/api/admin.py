@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Product, ProductImage, Size, ContactUs, Order, OrderItem, Category,Stuff
+from .models import Product, ProductImage, Size, ContactUs, Order, OrderItem, Category,Stuff,OutgoingEmail
+from .services.product_cards import delete_product_images
 
 class OrderItemInline(admin.TabularInline):
     model = Order.items.through
@@ -21,8 +22,23 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_display = ['id', 'product']
     search_fields = ['product__title']
 
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'sent_at']
+
+@admin.register(ProductImage)
+class ProductImageAdmin(admin.ModelAdmin):
+    # Deleted images must disappear from the cards of their products
+
+    def delete_model(self, request, obj):
+        delete_product_images(ProductImage.objects.filter(id=obj.id))
+
+    def delete_queryset(self, request, queryset):
+        delete_product_images(queryset)
+
 admin.site.register(Product)
-admin.site.register(ProductImage)
 admin.site.register(Size)
 admin.site.register(ContactUs)
 admin.site.register(Category)
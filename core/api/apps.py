@@ -7,3 +7,9 @@ class ApiConfig(AppConfig):
 
     def ready(self):
         import api.signals  # Import the signals
+        import api.invalidation  # Catalog cache invalidation
+
+        from django.conf import settings
+        if settings.CACHE_WARM_ON_STARTUP:
+            from api.services.cache_warmer import warm_in_background
+            warm_in_background()
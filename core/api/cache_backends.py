@@ -0,0 +1,78 @@
+import os
+import pickle
+import tempfile
+import time
+import zlib
+
+from django.core.cache.backends import filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """
+    Django's file cache with two fixes for sharing it between workers:
+
+    - add() is atomic. Django checks has_key() and then set(), so two
+      processes can both "add" the same key and single-flight locks built
+      on it don't hold. Here the entry is written to a temp file and
+      hard-linked into place, which fails if the key already exists.
+    - set() lists the whole cache directory to decide whether to cull, so
+      each write costs O(entries) and warming a few thousand product
+      details slows to a crawl. Culling is checked every
+      CULL_CHECK_INTERVAL writes instead; the directory can overshoot
+      MAX_ENTRIES by at most that many files per connection.
+    - incr() keeps the entry's expiry. Django's get() + set() resets it to
+      the default TIMEOUT, so counters stored with timeout=None (the
+      catalog cache versions) would expire a few minutes after a bump.
+    """
+    CULL_CHECK_INTERVAL = 100
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._writes = 0
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()  # Cache dir can be deleted at any time.
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            # An expired entry is removed by has_key(), then retried once
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    if self.has_key(key, version):
+                        return False
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        try:
+            with open(fname, 'rb') as f:
+                expiry = pickle.load(f)
+                value = pickle.loads(zlib.decompress(f.read())) + delta
+        except (FileNotFoundError, EOFError):
+            raise ValueError(f"Key '{key}' not found")
+        if expiry is not None and expiry < time.time():
+            raise ValueError(f"Key '{key}' not found")
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                f.write(pickle.dumps(expiry, self.pickle_protocol))
+                f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+            os.replace(tmp_path, fname)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return value
+
+    def _cull(self):
+        self._writes += 1
+        if self._writes % self.CULL_CHECK_INTERVAL == 1:
+            super()._cull()
@@ -0,0 +1,73 @@
+from functools import wraps
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+from api.services.catalog_cache import CatalogCache
+
+
+ENCODING_SUFFIXES = ('-gzip', '-br')
+
+
+def _strip_etag(etag):
+    etag = etag.removeprefix('W/').strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)]
+    return etag
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        return any(_strip_etag(tag) == etag for tag in parse_etags(if_none_match))
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+
+def _matches_any(request):
+    return '*' in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+
+def _not_modified_response(etag, last_modified):
+    response = HttpResponseNotModified()
+    response['ETag'] = quote_etag(etag)
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def catalog_conditional(name):
+    """
+    Add ETag / Last-Modified validators to a catalog GET handler and answer
+    matching conditional requests with 304 before the view runs.
+
+    Validators come from the CatalogCache tag versions of `name`, the host
+    (payloads embed absolute media URLs) and the full request path, so
+    nothing is queried or serialized to compute them. Compressed bodies get
+    a -gzip / -br suffix to keep the ETag strong. `If-None-Match: *` only
+    matches a resource that exists, so it is answered after the view ran.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def inner(self, request, *args, **kwargs):
+            tags = CatalogCache.DEPENDENCIES[name]
+            etag = CatalogCache.etag(name, request.get_host(), request.get_full_path())
+            last_modified = CatalogCache.last_modified(tags)
+
+            if _not_modified(request, etag, last_modified):
+                return _not_modified_response(etag, last_modified)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200 and _matches_any(request):
+                return _not_modified_response(etag, last_modified)
+            if response.status_code == 200:
+                encoding = response.get('Content-Encoding')
+                response['ETag'] = quote_etag(f'{etag}-{encoding}' if encoding else etag)
+                response['Last-Modified'] = http_date(last_modified)
+                # Let browsers and CDNs store the body but always revalidate
+                patch_cache_control(response, no_cache=True)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from api.models import Product, ProductImage, Size, Category, Review, Stuff
+from api.services.catalog_cache import CatalogCache
+
+
+# Catalog tags touched by a write to each model. Which cache entries depend
+# on which tags lives in CatalogCache.DEPENDENCIES.
+MODEL_TAGS = {
+    Product: (CatalogCache.PRODUCTS,),
+    ProductImage: (CatalogCache.PRODUCTS,),
+    Size: (CatalogCache.SIZES,),
+    Category: (CatalogCache.CATEGORIES,),
+    Review: (CatalogCache.REVIEWS,),
+    Stuff: (CatalogCache.TEAM,),
+}
+
+M2M_TAGS = {
+    Product.size.through: (CatalogCache.PRODUCTS,),
+    Product.images.through: (CatalogCache.PRODUCTS,),
+}
+
+
+def invalidate(*tags):
+    # Bump after commit so a reader can't re-cache pre-commit rows under
+    # the new version
+    transaction.on_commit(lambda: CatalogCache.bump(*tags))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_catalog(sender, **kwargs):
+    tags = MODEL_TAGS.get(sender)
+    if tags and not kwargs.get('raw'):
+        invalidate(*tags)
+
+
+@receiver(m2m_changed)
+def invalidate_catalog_relations(sender, action, **kwargs):
+    tags = M2M_TAGS.get(sender)
+    if tags and action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate(*tags)
@@ -0,0 +1,192 @@
+import json
+import math
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Category, Order, Product
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = 'Measures p50/p95/p99 latency and throughput of the public and admin endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per endpoint')
+        parser.add_argument(
+            '--url', default=None,
+            help='Base URL of a running server (e.g. http://127.0.0.1:8000); '
+                 'without it requests go through the in-process test client'
+        )
+        parser.add_argument('--concurrency', type=int, default=1, help='Parallel clients when --url is given')
+        parser.add_argument('--cold', action='store_true', help='Start every request with an empty private cache (test client only)')
+        parser.add_argument('--only', nargs='*', default=None, help='Benchmark only these endpoint names')
+        parser.add_argument('--skip-admin', action='store_true', help='Leave out the admin endpoints')
+        parser.add_argument('--output', default=None, help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        if options['cold'] and options['url']:
+            raise CommandError('--cold only works with the in-process test client')
+        product = Product.objects.order_by('-created_at').first()
+        if product is None:
+            raise CommandError('No products found, run generate_fake_data first')
+
+        endpoints = self.endpoints(product, options)
+        if options['only']:
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in options['only']]
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = {row['endpoint']: row for row in json.load(f)}
+
+        self.stdout.write(
+            f"{'endpoint':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'req/s':>10}"
+            + (f"{'p95 vs base':>14}" if baseline else '')
+        )
+        results = []
+        with ExitStack() as stack:
+            if not options['url']:
+                # Rate limits would turn most in-process requests into 429s
+                stack.enter_context(mock.patch.object(APIView, 'throttle_classes', []))
+            if options['cold']:
+                # Cleared before every request; the shared cache other
+                # clients and the warmer rely on stays untouched
+                stack.enter_context(override_settings(CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'benchmark-cold',
+                }}))
+            for name, path, headers in endpoints:
+                result = self.run(name, path, headers, options)
+                results.append(result)
+                self.report(result, baseline.get(name))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, result, baseline):
+        line = (
+            f"{result['endpoint']:<22}{result['requests']:>6}{result['p50']:>10.1f}{result['p95']:>10.1f}"
+            f"{result['p99']:>10.1f}{result['mean']:>10.1f}{result['throughput']:>10.1f}"
+        )
+        if baseline and baseline['p95']:
+            change = (result['p95'] - baseline['p95']) / baseline['p95'] * 100
+            line += f'{change:>+13.1f}%'
+        if result['errors']:
+            line += f"  ({result['errors']} errors)"
+        self.stdout.write(line)
+
+    def endpoints(self, product, options):
+        """(name, path, extra headers) for every endpoint to measure"""
+        category = Category.objects.first()
+        ids = ','.join(str(pk) for pk in Product.objects.values_list('id', flat=True)[:20])
+        word = product.title.split()[0]
+        endpoints = [
+            ('products', '/api/products/', {}),
+            ('products_page_100', '/api/products/?page_size=100', {}),
+            ('products_filtered', f'/api/products/?category={category.id}&ordering=price', {}),
+            ('product_detail', f'/api/products/{product.id}/', {}),
+            ('product_batch', f'/api/products/batch/?ids={ids}', {}),
+            ('product_search', f'/api/products/search/?q={word}', {}),
+            ('featured_products', '/api/featured-products/', {}),
+            ('categories', '/api/categories/', {}),
+            ('sizes', '/api/sizes/', {}),
+            ('team', '/api/team/', {}),
+            ('reviews', '/api/reviews/', {}),
+        ]
+        if not options['skip_admin']:
+            user = User.objects.filter(is_staff=True).first()
+            if user is None:
+                self.stderr.write('No staff user found, skipping the admin endpoints')
+            else:
+                auth = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+                endpoints += [
+                    ('admin_products', '/api/admin/products/', auth),
+                    ('admin_categories', '/api/admin/categories/', auth),
+                    ('admin_orders', '/api/admin/orders/', auth),
+                ]
+                order = Order.objects.first()
+                if order is not None:
+                    endpoints.append(('admin_order_detail', f'/api/admin/orders/{order.id}/', auth))
+        return endpoints
+
+    def run(self, name, path, headers, options):
+        if options['url']:
+            fetch = self.http_fetcher(options['url'], path, headers)
+        else:
+            fetch = self.client_fetcher(path, headers, options['cold'])
+
+        for _ in range(options['warmup']):
+            fetch()
+
+        concurrency = max(1, options['concurrency']) if options['url'] else 1
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                samples = list(executor.map(lambda _: fetch(), range(options['requests'])))
+        else:
+            samples = [fetch() for _ in range(options['requests'])]
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for latency, ok in samples)
+        return {
+            'endpoint': name,
+            'path': path,
+            'requests': len(samples),
+            'errors': sum(1 for latency, ok in samples if not ok),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'throughput': len(samples) / elapsed if elapsed else 0.0,
+        }
+
+    @staticmethod
+    def client_fetcher(path, headers, cold):
+        client = Client(headers=headers)
+
+        def fetch():
+            if cold:
+                cache.clear()
+            start = time.perf_counter()
+            response = client.get(path)
+            return (time.perf_counter() - start) * 1000, response.status_code < 400
+        return fetch
+
+    @staticmethod
+    def http_fetcher(base_url, path, headers):
+        url = base_url.rstrip('/') + path
+        headers = {'Accept-Encoding': 'gzip, br', **headers}
+
+        def fetch():
+            request = urllib.request.Request(url, headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = response.status < 400
+            except (urllib.error.URLError, TimeoutError):
+                ok = False
+            return (time.perf_counter() - start) * 1000, ok
+        return fetch
@@ -0,0 +1,105 @@
+import uuid
+from datetime import timedelta
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import Category, ProductImage, Stuff
+from api.services.image_pipeline import RENDITIONS_DIR
+from api.services.media_store import walk_storage
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Reports (and with --delete removes) product images and media files nothing refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Remove orphans instead of only reporting them')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows or files handled per query')
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Hours an image or file must be old before it is collected, so uploads in flight are never touched'
+        )
+
+    def handle(self, *args, **options):
+        self.delete = options['delete']
+        self.batch_size = options['batch_size']
+        self.cutoff = timezone.now() - timedelta(hours=options['min_age'])
+
+        rows = self.collect_rows()
+        verb = 'Deleted' if self.delete else 'Found'
+        self.stdout.write(f'{verb} {rows} product images not used by any product')
+
+        files = size = 0
+        for directory, referenced in self.directories():
+            # Renditions live below product_images/ but are checked on their own pass
+            files_in_directory = walk_storage(default_storage, directory, exclude=(RENDITIONS_DIR,))
+            for names in batched(files_in_directory, self.batch_size):
+                orphans = self.orphans(names, referenced)
+                for name in orphans:
+                    files += 1
+                    size += default_storage.size(name)
+                    if self.delete:
+                        default_storage.delete(name)
+                    elif options['verbosity'] > 1:
+                        self.stdout.write(name)
+        self.stdout.write(f'{verb} {files} unreferenced files ({size / 1024 / 1024:.1f} MB)')
+        if not self.delete:
+            self.stdout.write('Dry run: pass --delete to remove them')
+
+    def collect_rows(self):
+        """Delete, batch by batch, images left behind by removed products"""
+        # Uploads are created before they are attached to their product
+        orphans = ProductImage.objects.filter(
+            product_images__isnull=True, created_at__lt=self.cutoff
+        ).order_by('id')
+        if not self.delete:
+            return orphans.count()
+        total = 0
+        while ids := list(orphans.values_list('id', flat=True)[:self.batch_size]):
+            ProductImage.objects.filter(id__in=ids).delete()
+            total += len(ids)
+        return total
+
+    def directories(self):
+        """(storage directory, function returning the referenced names of a batch)"""
+        # Young rows are kept by collect_rows, so their files are too
+        in_use = ProductImage.objects.filter(Q(product_images__isnull=False) | Q(created_at__gte=self.cutoff))
+        for model, queryset in ((ProductImage, in_use), (Category, Category.objects), (Stuff, Stuff.objects)):
+            yield model.image.field.upload_to.rstrip('/'), self.file_references(queryset)
+        # Renditions are stored per image id rather than by name
+        yield RENDITIONS_DIR, self.rendition_references(in_use)
+
+    @staticmethod
+    def file_references(queryset):
+        def referenced(names):
+            return set(queryset.filter(image__in=names).values_list('image', flat=True))
+        return referenced
+
+    @staticmethod
+    def rendition_references(queryset):
+        def referenced(names):
+            ids = {}
+            for name in names:
+                try:
+                    ids[name] = uuid.UUID(name[len(RENDITIONS_DIR) + 1:].split('/')[0])
+                except ValueError:
+                    continue
+            live = set(queryset.filter(id__in=set(ids.values())).values_list('id', flat=True))
+            return {name for name, image_id in ids.items() if image_id in live}
+        return referenced
+
+    def orphans(self, names, referenced):
+        unreferenced = set(names) - referenced(names)
+        return [
+            name for name in names
+            if name in unreferenced and default_storage.get_modified_time(name) < self.cutoff
+        ]
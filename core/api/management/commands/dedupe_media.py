@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from api.models import Category, Product, ProductImage, Stuff
+from api.services.catalog_cache import CatalogCache
+from api.services.media_store import content_name, hash_file
+from api.services.product_cards import schedule_refresh
+
+
+class Command(BaseCommand):
+    help = 'Moves existing images to content-addressed names and merges duplicate product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+        parser.add_argument('--keep-files', action='store_true', help='Do not delete the old copies of moved files')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows read per query')
+
+    def handle(self, *args, **options):
+        for model in (ProductImage, Category, Stuff):
+            moved, missing = self.hash_files(model, options)
+            self.stdout.write(f'{model.__name__}: {moved} files content addressed, {missing} missing')
+
+        merged = self.merge_product_images(options['dry_run'])
+        self.stdout.write(f'ProductImage: {merged} duplicate rows merged')
+
+    def hash_files(self, model, options):
+        """Give every stored file without a hash its content-addressed name"""
+        moved = missing = 0
+        rows = (
+            model.objects.filter(content_hash='')
+            .exclude(image='').exclude(image__isnull=True)
+            .order_by('pk')
+        )
+        for instance in rows.iterator(chunk_size=options['batch_size']):
+            field_file = instance.image
+            storage = field_file.storage
+            try:
+                with field_file.open('rb') as f:
+                    digest = hash_file(f)
+                    name = content_name(field_file.field.upload_to, digest, field_file.name)
+                    if not options['dry_run'] and not storage.exists(name):
+                        name = storage.save(name, f)
+            except FileNotFoundError:
+                self.stderr.write(f'{model.__name__} {instance.pk}: {field_file.name} not found')
+                missing += 1
+                continue
+
+            moved += 1
+            if options['dry_run']:
+                continue
+            old_name = field_file.name
+            instance.image = name
+            instance.content_hash = digest
+            instance.save(update_fields=['image', 'content_hash'])
+            if old_name != name and not options['keep_files']:
+                storage.delete(old_name)
+        return moved, missing
+
+    def merge_product_images(self, dry_run):
+        """Point products at one row per content hash and drop the rest"""
+        through = Product.images.through
+        duplicates = (
+            ProductImage.objects.exclude(content_hash='')
+            .values('content_hash').annotate(count=Count('id')).filter(count__gt=1)
+            .values_list('content_hash', flat=True)
+        )
+        merged = 0
+        for content_hash in list(duplicates):
+            # Keep the row whose renditions are already generated
+            rows = list(
+                ProductImage.objects.filter(content_hash=content_hash)
+                .order_by('processed_at', 'id')
+                .only('id', 'processed_at')
+            )
+            rows.sort(key=lambda row: row.processed_at is None)
+            keep, drop = rows[0], [row.id for row in rows[1:]]
+            merged += len(drop)
+            if dry_run:
+                continue
+
+            with transaction.atomic():
+                product_ids = set(through.objects.filter(productimage_id__in=drop).values_list('product_id', flat=True))
+                through.objects.bulk_create(
+                    [through(product_id=product_id, productimage_id=keep.id) for product_id in product_ids],
+                    ignore_conflicts=True
+                )
+                ProductImage.objects.filter(id__in=drop).delete()
+                schedule_refresh(product_ids)
+
+        if merged and not dry_run:
+            # bulk_create on the through table sends no m2m_changed
+            CatalogCache.bump(CatalogCache.PRODUCTS)
+        return merged
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.services.catalog_export import CatalogExporter
+
+
+class Command(BaseCommand):
+    help = 'Writes pre-compressed JSON snapshots of the public catalog endpoints for static serving'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=None,
+            help=f'Directory to write to (default: CATALOG_SNAPSHOT_ROOT, {settings.CATALOG_SNAPSHOT_ROOT})'
+        )
+        parser.add_argument(
+            '--products', nargs='*', default=None,
+            help='Only refresh the files affected by these product ids'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with CatalogExporter(options['output']) as exporter:
+            if options['products'] is None:
+                exporter.export_all()
+            else:
+                exporter.export_products(options['products'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{exporter.written} files written, {exporter.removed} removed in {exporter.root} '
+            f"(version {exporter.manifest['version']}, {time.perf_counter() - start:.1f}s)"
+        ))
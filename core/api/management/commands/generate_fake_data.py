@@ -1,158 +1,183 @@
-# from django.core.management.base import BaseCommand
-# from django.utils import timezone
-# from api.models import (
-#     Product, 
-#     ProductImage, 
-#     Composition, 
-#     Category, 
-#     SubCategory,
-#     ContactUs, 
-#     Inquiry, 
-#     InquiryItems
-# )
-# from faker import Faker
-# import random
-# from datetime import timedelta
-# import uuid
-
-# fake = Faker()
-
-# class Command(BaseCommand):
-#     help = 'Generates fake data for testing'
-
-#     def handle(self, *args, **kwargs):
-#         self.stdout.write('Generating fake data...')
-
-#         # Create Compositions (Materials)
-#         compositions = []
-#         material_types = [
-#             'Cotton', 'Polyester', 'Wool', 'Silk', 'Linen', 
-#             'Leather', 'Denim', 'Nylon', 'Cashmere', 'Modal'
-#         ]
-#         for material in material_types:
-#             composition = Composition.objects.create(material=material)
-#             compositions.append(composition)
-#         self.stdout.write(f'Created {len(compositions)} compositions')
-
-#         # Create Product Images
-#         product_images = []
-#         image_urls = [
-#             'https://img.freepik.com/free-photo/male-belt-sweater-accessories-clothes_1203-6421.jpg',
-#             'https://img.freepik.com/free-photo/brown-leather-shoes_1203-8175.jpg',
-#             'https://img.freepik.com/free-photo/men-shirt_1203-8356.jpg',
-#             'https://img.freepik.com/free-photo/shirt-hangers_1203-8389.jpg',
-#             'https://img.freepik.com/free-photo/overhead-view-womans-casual-outfits_93675-133151.jpg'
-#         ]
-#         for url in image_urls:
-#             # Create a temporary file name for the image
-#             image_name = f"product_images/{uuid.uuid4()}.jpg"
-#             image = ProductImage.objects.create(image=image_name)
-#             product_images.append(image)
-#         self.stdout.write(f'Created {len(product_images)} product images')
-
-#         # Create Categories and SubCategories
-#         categories_data = {
-#             'mens': {
-#                 'name': 'MENS PRODUCTS',
-#                 'subcategories': [
-#                     {'name': 'Mens Sweater', 'slug': 'mens-sweater', 'icon': '🧥'},
-#                     {'name': 'Mens T-Shirt', 'slug': 'mens-tshirt', 'icon': '👕'},
-#                     {'name': 'Mens Hoodie', 'slug': 'mens-hoodie', 'icon': '🧥'},
-#                 ]
-#             },
-#             'ladies': {
-#                 'name': 'LADIES PRODUCTS',
-#                 'subcategories': [
-#                     {'name': 'Ladies Sweater', 'slug': 'ladies-sweater', 'icon': '🧥'},
-#                     {'name': 'Ladies T-Shirt', 'slug': 'ladies-tshirt', 'icon': '👚'},
-#                     {'name': 'Ladies Pants', 'slug': 'ladies-pants', 'icon': '👖'},
-#                 ]
-#             },
-#             'boys': {
-#                 'name': 'BOYS PRODUCTS',
-#                 'subcategories': [
-#                     {'name': 'Boys Sweater', 'slug': 'boys-sweater', 'icon': '🧥'},
-#                     {'name': 'Boys T-Shirt', 'slug': 'boys-tshirt', 'icon': '👕'},
-#                     {'name': 'Boys Denim', 'slug': 'boys-denim', 'icon': '👖'},
-#                 ]
-#             }
-#         }
-
-#         categories = {}
-#         for cat_key, cat_data in categories_data.items():
-#             # Create Category
-#             category = Category.objects.create(
-#                 name=cat_data['name']
-#             )
-            
-#             # Create SubCategories
-#             for sub_data in cat_data['subcategories']:
-#                 subcategory = SubCategory.objects.create(
-#                     name=sub_data['name']
-#                 )
-#                 category.subcategories.add(subcategory)
-            
-#             categories[cat_key] = category
-
-#         self.stdout.write(f'Created {len(categories)} categories with subcategories')
-
-#         # Create Products
-#         products = []
-#         sample_types = ['Development', '1st Fit', '2nd Fit', 'PP Sample', 'Production']
-#         gauges = ['7GG', '12GG', '14GG', '16GG']
-#         ends = ['Single', 'Double', 'Triple']
-#         weights = ['150GSM', '180GSM', '200GSM', '220GSM', '250GSM']
-
-#         for category in categories.values():
-#             for _ in range(10):  # 10 products per category
-#                 product = Product.objects.create(
-#                     style_number=f"STY-{random.randint(1000, 9999)}",
-#                     gauge=random.choice(gauges),
-#                     end=random.choice(ends),
-#                     weight=random.choice(weights),
-#                     description=fake.paragraph(),
-#                     category=category,
-#                     image=random.choice(image_urls)
-#                 )
-                
-#                 # Add random compositions
-#                 for _ in range(random.randint(1, 3)):
-#                     product.composition.add(random.choice(compositions))
-                
-#                 # Add random product images
-#                 for _ in range(random.randint(1, 4)):
-#                     product.images.add(random.choice(product_images))
-                
-#                 products.append(product)
-
-#         self.stdout.write(f'Created {len(products)} products')
-
-#         # Create Contact Us entries
-#         for _ in range(10):
-#             ContactUs.objects.create(
-#                 name=fake.name(),
-#                 email=fake.email(),
-#                 subject=fake.sentence(),
-#                 message=fake.text(),
-#                 is_read=random.choice([True, False]),
-#                 created_at=timezone.now() - timedelta(days=random.randint(1, 30))
-#             )
-#         self.stdout.write('Created 10 contact us entries')
-
-#         # Create Inquiries with Items
-#         for _ in range(10):
-#             inquiry = Inquiry.objects.create(
-#                 name=fake.name(),
-#                 email=fake.email(),
-#                 subject=fake.sentence(),
-#                 message=fake.text(),
-#                 is_read=random.choice([True, False])
-#             )
-            
-#             # Add random products to inquiry
-#             for product in random.sample(products, k=random.randint(1, 3)):
-#                 inquiry_item = InquiryItems.objects.create(product=product)
-#                 inquiry.items.add(inquiry_item)
-
-#         self.stdout.write('Created 10 inquiries with items')
-#         self.stdout.write(self.style.SUCCESS('Successfully generated fake data')) 
\ No newline at end of file
+import random
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from faker import Faker
+
+from api.models import Category, ContactUs, Order, OrderItem, Product, ProductImage, Review, Size, Stuff
+from api.services.catalog_cache import CatalogCache
+from api.services.product_cards import rebuild_product_cards
+
+
+MAX_PRODUCTS = 100_000
+
+CATEGORY_NAMES = [
+    'Three Piece', 'Two Piece', 'Kurti', 'Saree', 'Abaya', 'Hijab', 'Borka', 'Kaftan',
+    'Palazzo', 'Dupatta', 'Kids', 'Winter Collection', 'Eid Collection', 'Party Wear',
+]
+SIZE_NAMES = ['XS', 'S', 'M', 'L', 'XL', 'XXL', '3XL', 'Free Size']
+FABRICS = ['Cotton', 'Linen', 'Georgette', 'Silk', 'Chiffon', 'Khadi', 'Muslin', 'Viscose', 'Jamdani']
+IMAGE_URL = 'https://picsum.photos/seed/{seed}/800/800'
+
+
+class Command(BaseCommand):
+    help = 'Seeds the database with a realistic fake catalog using bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help=f'Products to create (max {MAX_PRODUCTS})')
+        parser.add_argument('--categories', type=int, default=10, help='Categories to create')
+        parser.add_argument('--images-per-product', type=int, default=3, help='Images per product')
+        parser.add_argument('--sizes-per-product', type=int, default=4, help='Sizes per product')
+        parser.add_argument('--orders', type=int, default=200, help='Orders to create')
+        parser.add_argument('--items-per-order', type=int, default=3, help='Items per order')
+        parser.add_argument('--reviews', type=int, default=100, help='Reviews to create')
+        parser.add_argument('--team', type=int, default=8, help='Team members to create')
+        parser.add_argument('--messages', type=int, default=50, help='Contact messages to create')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data')
+        parser.add_argument('--clear', action='store_true', help='Delete existing catalog data first')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['products'] <= MAX_PRODUCTS:
+            raise CommandError(f'--products must be between 0 and {MAX_PRODUCTS}')
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        self.fake = Faker()
+        if options['seed'] is not None:
+            self.fake.seed_instance(options['seed'])
+
+        start = time.perf_counter()
+        if options['clear']:
+            self.clear()
+
+        with transaction.atomic():
+            categories = self.create_categories(options['categories'])
+            sizes = self.get_sizes()
+            products = self.create_products(categories, sizes, options)
+            self.create_orders(products, sizes, options)
+            self.create_extras(options)
+
+        # bulk_create sends no signals: refresh the search index, product
+        # cards and caches by hand
+        call_command('rebuild_search_index', stdout=self.stdout)
+        self.stdout.write(f'Built {rebuild_product_cards(self.batch_size)} product cards')
+        if settings.CATALOG_SNAPSHOTS:
+            call_command('export_catalog', stdout=self.stdout)
+        CatalogCache.bump(
+            CatalogCache.PRODUCTS, CatalogCache.CATEGORIES, CatalogCache.SIZES,
+            CatalogCache.REVIEWS, CatalogCache.TEAM
+        )
+        self.stdout.write(self.style.SUCCESS(f'Fake data generated in {time.perf_counter() - start:.1f}s'))
+
+    def clear(self):
+        for model in (Order, OrderItem, Product, ProductImage, Category, Size, Review, Stuff, ContactUs):
+            model.objects.all().delete()
+        self.stdout.write('Cleared existing data')
+
+    def create_categories(self, count):
+        names = [
+            CATEGORY_NAMES[i] if i < len(CATEGORY_NAMES) else f'{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} {i}'
+            for i in range(count)
+        ]
+        categories = Category.objects.bulk_create([Category(name=name) for name in names])
+        self.stdout.write(f'Created {len(categories)} categories')
+        return categories
+
+    def get_sizes(self):
+        existing = {size.size: size for size in Size.objects.filter(size__in=SIZE_NAMES)}
+        created = Size.objects.bulk_create([Size(size=name) for name in SIZE_NAMES if name not in existing])
+        return list(existing.values()) + created
+
+    def create_products(self, categories, sizes, options):
+        """Products, their images and both M2M tables, one batch at a time"""
+        product_ids = []
+        total = options['products']
+        per_product = options['images_per_product']
+        sizes_per_product = min(options['sizes_per_product'], len(sizes))
+
+        for offset in range(0, total, self.batch_size):
+            count = min(self.batch_size, total - offset)
+            products = Product.objects.bulk_create([
+                Product(
+                    title=f'{self.random.choice(FABRICS)} {self.fake.word().title()} {offset + i}'[:50],
+                    price=self.random.randrange(500, 15000, 50),
+                    description=self.fake.paragraph(nb_sentences=4),
+                    category=self.random.choice(categories),
+                )
+                for i in range(count)
+            ], batch_size=self.batch_size)
+
+            images = ProductImage.objects.bulk_create([
+                ProductImage(image_url=IMAGE_URL.format(seed=f'{product.id.hex[:12]}-{n}'))
+                for product in products for n in range(per_product)
+            ], batch_size=self.batch_size)
+            Product.images.through.objects.bulk_create([
+                Product.images.through(product_id=product.id, productimage_id=image.id)
+                for index, product in enumerate(products)
+                for image in images[index * per_product:(index + 1) * per_product]
+            ], batch_size=self.batch_size)
+            Product.size.through.objects.bulk_create([
+                Product.size.through(product_id=product.id, size_id=size.id)
+                for product in products
+                for size in self.random.sample(sizes, sizes_per_product)
+            ], batch_size=self.batch_size)
+
+            product_ids.extend(product.id for product in products)
+            self.stdout.write(f'Created {offset + count}/{total} products')
+        return product_ids
+
+    def create_orders(self, product_ids, sizes, options):
+        if not product_ids:
+            return
+        per_order = options['items_per_order']
+        for offset in range(0, options['orders'], self.batch_size):
+            count = min(self.batch_size, options['orders'] - offset)
+            items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    product_id=self.random.choice(product_ids),
+                    size=self.random.choice(sizes),
+                    quantity=self.random.randint(1, 3),
+                )
+                for _ in range(count * per_order)
+            ], batch_size=self.batch_size)
+            orders = Order.objects.bulk_create([
+                Order(
+                    customer_name=self.fake.name(),
+                    customer_phone=self.fake.numerify('017########'),
+                    customer_address=self.fake.address(),
+                    total_price=self.random.randrange(1000, 50000, 50),
+                    is_confirmed=self.random.random() < 0.5,
+                )
+                for _ in range(count)
+            ], batch_size=self.batch_size)
+            Order.items.through.objects.bulk_create([
+                Order.items.through(order_id=order.id, orderitem_id=item.id)
+                for index, order in enumerate(orders)
+                for item in items[index * per_order:(index + 1) * per_order]
+            ], batch_size=self.batch_size)
+        self.stdout.write(f"Created {options['orders']} orders")
+
+    def create_extras(self, options):
+        Review.objects.bulk_create([
+            Review(
+                name=self.fake.name(),
+                message=self.fake.sentence(nb_words=12),
+                rating=self.random.randint(3, 5),
+                approved=self.random.random() < 0.8,
+            )
+            for _ in range(options['reviews'])
+        ], batch_size=self.batch_size)
+        Stuff.objects.bulk_create([
+            Stuff(name=self.fake.name(), position=self.fake.job()[:200], s_id=str(i + 1))
+            for i in range(options['team'])
+        ])
+        ContactUs.objects.bulk_create([
+            ContactUs(name=self.fake.name(), email=self.fake.email(), message=self.fake.paragraph())
+            for _ in range(options['messages'])
+        ], batch_size=self.batch_size)
+        self.stdout.write(
+            f"Created {options['reviews']} reviews, {options['team']} team members, {options['messages']} messages"
+        )
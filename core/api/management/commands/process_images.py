@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.image_pipeline import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Generates responsive renditions for newly uploaded product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Images processed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new uploads')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            total_processed = total_failed = 0
+            while True:
+                processed, failed = process_pending(batch_size=options['batch_size'])
+                total_processed += processed
+                total_failed += failed
+                if processed + failed < options['batch_size']:
+                    break
+
+            if total_processed or total_failed or not options['loop']:
+                self.stdout.write(f'Processed {total_processed} images, {total_failed} failed')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
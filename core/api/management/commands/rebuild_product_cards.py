@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.catalog_cache import CatalogCache
+from api.services.product_cards import rebuild_product_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized ProductCard rows served by the storefront'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Products per refresh query')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        total = rebuild_product_cards(options['batch_size'])
+        CatalogCache.bump(CatalogCache.PRODUCTS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {total} product cards in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.services.search_index import create_search_table, get_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product full-text search index from the database'
+
+    def handle(self, *args, **kwargs):
+        if create_search_table():
+            self.stdout.write('Using SQLite FTS5 index')
+        else:
+            self.stdout.write('FTS5 unavailable, using in-process index')
+        get_search_index().rebuild()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.email_service import EmailService
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued emails from the outbox (order receipts, contact notifications)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages sent per connection')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before a message is marked failed')
+        parser.add_argument('--retry-delay', type=int, default=60, help='Base backoff in seconds')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            # Drain everything that is due, one batch (and connection) at a time
+            while True:
+                sent, failed = EmailService.deliver_queued(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    retry_delay=options['retry_delay'],
+                )
+                total_sent += sent
+                total_failed += failed
+                if sent + failed < options['batch_size']:
+                    break
+
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write(f'Sent {total_sent} emails, {total_failed} failed')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
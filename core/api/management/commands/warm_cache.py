@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.cache_warmer import CacheWarmer
+
+
+class Command(BaseCommand):
+    help = 'Pre-builds the public catalog cache entries (lists, categories and every product detail)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=None, help=f'Public host name (default: {settings.CACHE_WARM_HOST})')
+        parser.add_argument('--secure', action='store_true', default=None, help='Build https:// media URLs')
+        parser.add_argument('--pages', type=int, default=None, help='Product list pages to build')
+        parser.add_argument('--workers', type=int, default=None, help='Parallel threads')
+
+    def handle(self, *args, **options):
+        warmer = CacheWarmer(options['host'], options['secure'], options['pages'], options['workers'])
+        report = warmer.run()
+        total = report.pop('total')
+
+        failed = False
+        for group, entry in report.items():
+            line = f"{group:<20}{entry['tasks']:>6} tasks{entry['seconds']:>10.2f}s"
+            if entry['errors']:
+                failed = True
+                line += f"  ({len(entry['errors'])} failed: {entry['errors'][0]})"
+            self.stdout.write(line)
+        if failed:
+            raise CommandError(f'Cache partially warmed in {total:.1f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f'Cache warmed in {total:.1f}s with {warmer.workers} workers for {warmer.host}'
+        ))
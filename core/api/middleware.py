@@ -0,0 +1,65 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from api.services import metrics
+from api.services.catalog_export import deferred_exports
+
+
+class RequestMetricsMiddleware:
+    """
+    Count the SQL queries, cache lookups and serializer time of every
+    request, report them in a Server-Timing header and aggregate them per
+    endpoint for the admin metrics view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        # Route patterns keep the label set small; unknown URLs share one label
+        endpoint = match.route if match else 'unmatched'
+        metrics.registry.observe_request(endpoint, request.method, response.status_code, stats, total)
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = self.server_timing(stats, total)
+        return response
+
+    @staticmethod
+    def server_timing(stats, total):
+        entries = [f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries"']
+        if stats.cache_hits or stats.cache_misses:
+            result = 'miss' if stats.cache_misses else 'hit'
+            entries.append(f'cache;desc="{result} ({stats.cache_hits} hit, {stats.cache_misses} miss)"')
+        for name, seconds in stats.timings.items():
+            entries.append(f'{name};dur={seconds * 1000:.1f}')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+class CatalogExportMiddleware:
+    """
+    Run the catalog snapshot exports scheduled by a request once, after its
+    view returned, instead of once per model signal.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with deferred_exports():
+            return self.get_response(request)
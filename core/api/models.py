@@ -1,11 +1,26 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from uuid import uuid4
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 # Create your models here.
 class ProductImage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False, unique=True)
     image = models.ImageField(upload_to='product_images/', null=True, blank=True)
     image_url = models.URLField(max_length=200, null=True, blank=True)
+    # Responsive renditions generated by the image pipeline:
+    # {name: {'width': w, 'height': h, 'jpeg': path, 'webp': path}}
+    renditions = models.JSONField(default=dict, blank=True)
+    # Inline ~20px preview (data: URI) and #rrggbb shown while the image loads
+    placeholder = models.TextField(blank=True)
+    dominant_color = models.CharField(max_length=7, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Why the last processing attempt failed; such images aren't retried
+    processing_error = models.TextField(blank=True)
+    # Lets collect_media leave images of uploads still in flight alone
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # SHA-256 of the uploaded bytes; identical uploads share one row and file
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
 
     def clean(self):
         if not self.image and not self.image_url:
@@ -39,6 +54,7 @@ class Category(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False, unique=True)
     image = models.ImageField(upload_to='category_images/',null=True, blank=True)
     name = models.CharField(max_length=50)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
     def __str__(self):
         return self.name
 
@@ -77,12 +93,43 @@ class Product(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['title', 'category']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['category', 'created_at']),
+            models.Index(fields=['price', 'id']),
+        ]
+
+class ProductCard(models.Model):
+    """
+    Denormalized, read-only copy of a product as the storefront shows it,
+    kept up to date by api.signals. Lists and details are served from this
+    one table instead of joining categories, sizes and images.
+    """
+    id = models.UUIDField(primary_key=True)  # the product id
+    category_id = models.UUIDField(null=True, blank=True)
+    title = models.CharField(max_length=50)
+    price = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    # ProductSerializer / ProductDetailSerializer output with media URLs
+    # relative to the site
+    card = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    detail = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['category_id', 'created_at']),
+            models.Index(fields=['price', 'id']),
         ]
 
 class Stuff(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False, unique=True)
     name = models.CharField(max_length=200)
     image = models.ImageField(upload_to='stuff_images/',null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
     position = models.CharField(max_length=200)
     s_id = models.CharField(max_length=30)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -132,6 +179,12 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
+        # The admin order list pages by (created_at, id), optionally
+        # filtered on is_confirmed
+        indexes = [
+            models.Index(fields=['is_confirmed', 'created_at']),
+            models.Index(fields=['created_at', 'id']),
+        ]
  
 
 
@@ -147,3 +200,40 @@ class Review(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class OutgoingEmail(models.Model):
+    """
+    Email outbox. Views queue messages here and the send_queued_emails
+    command delivers them, so requests never wait on SMTP.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False, unique=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} - {self.status}"
+
+    class Meta:
+        verbose_name = 'Outgoing Email'
+        verbose_name_plural = 'Outgoing Emails'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
@@ -0,0 +1,104 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_page_size(request):
+    """
+    Read ?page_size= from the request, falling back to DEFAULT_PAGE_SIZE
+    and clamping to MAX_PAGE_SIZE.
+    """
+    try:
+        page_size = int(request.query_params.get('page_size', settings.DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = settings.DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, settings.MAX_PAGE_SIZE))
+
+
+class KeysetPaginator:
+    """
+    Keyset (cursor) pagination over (<field>, id).
+
+    The cursor is an opaque token holding the sort value and id of the last
+    row of the previous page. Rows with a NULL sort value are placed after
+    all others and paged as a separate tail segment ordered by id, so each
+    segment is an indexed range scan bounded by the cursor, no matter how
+    deep the client has paged. A page straddling both segments costs one
+    extra query.
+    """
+
+    def __init__(self, ordering='-created_at'):
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+        self.op = 'lt' if self.descending else 'gt'
+
+    def order(self, queryset):
+        if self.descending:
+            return queryset.order_by(f'-{self.field}', '-id')
+        return queryset.order_by(self.field, 'id')
+
+    def encode(self, obj):
+        value = getattr(obj, self.field)
+        if value is not None and not isinstance(value, (int, float, str)):
+            value = value.isoformat()
+        raw = json.dumps([value, str(obj.pk)]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor, model):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded))
+            field = model._meta.get_field(self.field)
+            if value is not None:
+                value = field.to_python(value)
+            pk = model._meta.pk.to_python(pk)
+        except Exception as e:
+            raise InvalidCursor('Invalid cursor') from e
+        return value, pk
+
+    def after(self, value, pk):
+        """
+        Filter matching every non-NULL row that sorts after (value, pk).
+        The outer bound (field <= value, or >= ascending) keeps it a range.
+        """
+        bound = 'lte' if self.descending else 'gte'
+        return Q(**{f'{self.field}__{bound}': value}) & (
+            Q(**{f'{self.field}__{self.op}': value}) | Q(**{self.field: value, f'id__{self.op}': pk})
+        )
+
+    def paginate(self, queryset, cursor, page_size):
+        """
+        Return (rows, next_cursor) for the page following `cursor`.
+        next_cursor is None on the last page.
+        """
+        value = pk = None
+        if cursor:
+            value, pk = self.decode(cursor, queryset.model)
+        nullable = queryset.model._meta.get_field(self.field).null
+        limit = page_size + 1
+
+        rows = []
+        if not cursor or value is not None:
+            head = self.order(queryset)
+            if cursor:
+                head = head.filter(self.after(value, pk))
+            elif nullable:
+                head = head.filter(**{f'{self.field}__isnull': False})
+            rows = list(head[:limit])
+        if nullable and len(rows) < limit:
+            tail = queryset.filter(**{f'{self.field}__isnull': True}).order_by('-id' if self.descending else 'id')
+            if cursor and value is None:
+                tail = tail.filter(**{f'id__{self.op}': pk})
+            rows += list(tail[:limit - len(rows)])
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = self.encode(rows[-1])
+        return rows, next_cursor
@@ -1,4 +1,9 @@
+from uuid import UUID
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import Prefetch
+from django.core.files.storage import default_storage
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from .models import (
     Product, 
@@ -22,19 +27,40 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'image_url']
+        fields = ['id', 'image', 'image_url', 'srcset', 'placeholder', 'dominant_color']
+
+    def build_url(self, url):
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
     
     def get_image(self, obj):
+        # Prefer the optimized detail rendition over the original upload
+        detail = obj.renditions.get('detail')
+        if detail and detail.get('jpeg'):
+            return self.build_url(default_storage.url(detail['jpeg']))
         if obj.image:
-            request = self.context.get('request')
-            if request is not None:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
+            return self.build_url(obj.image.url)
         return None
 
+    def get_srcset(self, obj):
+        """
+        {name: {'width': w, 'height': h, 'jpeg': url, 'webp': url, ...}}
+        for every generated rendition, empty until processing is done
+        """
+        srcset = {}
+        for name, rendition in obj.renditions.items():
+            srcset[name] = {
+                key: value if key in ('width', 'height') else self.build_url(default_storage.url(value))
+                for key, value in rendition.items()
+            }
+        return srcset
+
 class SizeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Size
@@ -58,6 +84,50 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_image(self, obj):
         return ProductImageSerializer(obj.image).data
 
+class ProductFilterSerializer(serializers.Serializer):
+    """
+    Validates the query params accepted by the public product list.
+    """
+    ORDERING_CHOICES = ['-created_at', 'created_at', 'price', '-price']
+
+    category = serializers.UUIDField(required=False)
+    size = serializers.UUIDField(required=False)
+    min_price = serializers.IntegerField(required=False, min_value=0)
+    max_price = serializers.IntegerField(required=False, min_value=0)
+    ordering = serializers.ChoiceField(choices=ORDERING_CHOICES, required=False, default='-created_at')
+
+    def validate(self, data):
+        if 'min_price' in data and 'max_price' in data and data['min_price'] > data['max_price']:
+            raise serializers.ValidationError("min_price cannot be greater than max_price.")
+        return data
+
+    def get_queryset_filters(self):
+        lookups = {
+            'category': 'category_id',
+            'size': 'size',
+            'min_price': 'price__gte',
+            'max_price': 'price__lte',
+        }
+        return {
+            lookup: self.validated_data[field]
+            for field, lookup in lookups.items()
+            if field in self.validated_data
+        }
+
+    def get_card_filters(self):
+        """The same filters for the ProductCard read model"""
+        filters = self.get_queryset_filters()
+        if 'size' in filters:
+            filters['id__in'] = Product.size.through.objects.filter(
+                size_id=filters.pop('size')
+            ).values('product_id')
+        return filters
+
+    def get_cache_parts(self):
+        """Canonical, key-safe representation of the active filters"""
+        return [f'{field}={value}' for field, value in sorted(self.validated_data.items())]
+
+
 class ProductDetailSerializer(serializers.ModelSerializer):
     size = serializers.SerializerMethodField()
     category = serializers.SerializerMethodField()
@@ -68,11 +138,13 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'images', 'price', 'category', 'size', 'description']
 
     def get_size(self, obj):
-        return [{'id': s.id, 'size': s.size} for s in obj.size.all()]
+        return [{'id': str(s.id), 'size': s.size} for s in obj.size.all()]
     
     def get_category(self, obj):
+        if obj.category is None:
+            return None
         return {
-            'id': obj.category.id,
+            'id': str(obj.category.id),
             'name': obj.category.name,
             
         }
@@ -128,30 +200,73 @@ class OrderSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Prefetch everything the nested item/product representation reads"""
+        return queryset.prefetch_related(
+            Prefetch(
+                'items',
+                queryset=OrderItem.objects.select_related('product__category', 'size').prefetch_related(
+                    Prefetch('product__size', queryset=Size.objects.only('id', 'size')),
+                    Prefetch('product__images', queryset=ProductImage.objects.only('id', 'image', 'image_url', 'renditions', 'placeholder', 'dominant_color'))
+                )
+            )
+        )
+
+    def validate_items_data(self, items_data):
+        cleaned = []
+        for item_data in items_data:
+            if not isinstance(item_data, dict) or not item_data.get('product_id'):
+                raise serializers.ValidationError("Each item needs a product_id.")
+            try:
+                item = {
+                    'product_id': UUID(str(item_data['product_id'])),
+                    'size_id': UUID(str(item_data['size_id'])) if item_data.get('size_id') else None,
+                    'quantity': int(item_data.get('quantity', 1)),
+                }
+            except (TypeError, ValueError):
+                raise serializers.ValidationError("Invalid product_id, size_id or quantity.")
+            if item['quantity'] < 1:
+                raise serializers.ValidationError("Invalid product_id, size_id or quantity.")
+            cleaned.append(item)
+        return cleaned
+
     def create(self, validated_data):
+        """
+        Create the order and all its items with a constant number of queries:
+        products and sizes are resolved with one IN query each, and the
+        items and their order links are inserted with bulk_create.
+        """
         items_data = validated_data.pop('items_data', [])
-        order = Order.objects.create(**validated_data)
-        
+
+        products = Product.objects.only('id', 'price').in_bulk(
+            {item['product_id'] for item in items_data}
+        )
+        sizes = Size.objects.in_bulk(
+            {item['size_id'] for item in items_data if item['size_id']}
+        )
+
+        order_items = []
         total_price = 0
         for item_data in items_data:
-            product = get_object_or_404(Product, id=item_data['product_id'])
-            quantity = item_data.get('quantity', 1)
-            
-            # Get the size if provided
+            product = products.get(item_data['product_id'])
+            if product is None:
+                raise Http404(f"No Product matches the given query: {item_data['product_id']}")
             size = None
-            if 'size_id' in item_data and item_data['size_id']:
-                size = get_object_or_404(Size, id=item_data['size_id'])
-            
-            order_item = OrderItem.objects.create(
-                product=product,
-                quantity=quantity,
-                size=size
-            )
-            order.items.add(order_item)
-            total_price += product.price * quantity if product.price else 0
-        
-        order.total_price = total_price
-        order.save()
+            if item_data['size_id']:
+                size = sizes.get(item_data['size_id'])
+                if size is None:
+                    raise Http404(f"No Size matches the given query: {item_data['size_id']}")
+            order_items.append(OrderItem(product=product, quantity=item_data['quantity'], size=size))
+            total_price += product.price * item_data['quantity'] if product.price else 0
+
+        with transaction.atomic():
+            order = Order.objects.create(total_price=total_price, **validated_data)
+            OrderItem.objects.bulk_create(order_items)
+            Order.items.through.objects.bulk_create([
+                Order.items.through(order_id=order.id, orderitem_id=item.id)
+                for item in order_items
+            ])
         return order
     
     
@@ -0,0 +1,126 @@
+"""
+Pre-builds the public catalog cache entries so the first visitors after a
+deploy don't pay for rendering them.
+
+Entries are built by calling the real views (throttling and auth switched
+off for these calls only) or get_product_details, so keys and payloads are
+exactly what a visitor's request would have produced. Cached payloads
+embed absolute media URLs, so warm with the public host name
+(CACHE_WARM_HOST) rather than whatever host the process runs on.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.test import RequestFactory
+
+from api.models import Category, Product
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+
+    def __init__(self, host=None, secure=None, pages=None, workers=None):
+        self.host = host or settings.CACHE_WARM_HOST
+        self.secure = settings.CACHE_WARM_SECURE if secure is None else secure
+        self.pages = settings.CACHE_WARM_PAGES if pages is None else pages
+        self.workers = workers or settings.CACHE_WARM_WORKERS
+        self.factory = RequestFactory()
+
+    def request(self, path):
+        return self.factory.get(path, HTTP_HOST=self.host, secure=self.secure)
+
+    def call(self, view_class, path, **kwargs):
+        # Per-instance overrides: live requests keep their rate limits
+        view = view_class.as_view(throttle_classes=[], authentication_classes=[], permission_classes=[])
+        response = view(self.request(path), **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}')
+        return response
+
+    def warm_list(self, path, pages):
+        """Follow next_cursor for up to `pages` pages of a product list"""
+        from api.views import ProductList
+        page_path = path
+        for _ in range(pages):
+            data = json.loads(self.call(ProductList, page_path).content)
+            if not data['has_more']:
+                break
+            page_path = f"{path}{'&' if '?' in path else '?'}cursor={data['next_cursor']}"
+
+    def warm_details(self, ids):
+        from api.views import get_product_details
+        get_product_details(self.request('/'), ids)
+
+    def tasks(self):
+        """(group, callable) for every entry to build"""
+        from api.views import CategoryList, FeaturedProducts
+        tasks = [
+            ('categories', lambda: self.call(CategoryList, '/api/categories/')),
+            ('featured products', lambda: self.call(FeaturedProducts, '/api/featured-products/')),
+            ('product list', lambda: self.warm_list('/api/products/', self.pages)),
+        ]
+        tasks += [
+            ('category pages', lambda pk=pk: self.warm_list(f'/api/products/?category={pk}', 1))
+            for pk in Category.objects.values_list('id', flat=True)
+        ]
+        ids = [str(pk) for pk in Product.objects.order_by('-created_at', '-id').values_list('id', flat=True)]
+        tasks += [
+            ('product details', lambda chunk=ids[start:start + settings.MAX_PAGE_SIZE]: self.warm_details(chunk))
+            for start in range(0, len(ids), settings.MAX_PAGE_SIZE)
+        ]
+        return tasks
+
+    def run_task(self, group, task):
+        start = time.perf_counter()
+        try:
+            task()
+            return group, time.perf_counter() - start, None
+        except Exception as e:
+            return group, time.perf_counter() - start, e
+        finally:
+            # Worker threads open their own connections
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+
+    def run(self):
+        """
+        Build everything in parallel and return
+        {group: {'tasks': n, 'seconds': summed task time, 'errors': [...]}}
+        plus the wall time under 'total'.
+        """
+        start = time.perf_counter()
+        report = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            if self.workers > 1:
+                results = executor.map(lambda item: self.run_task(*item), self.tasks())
+            else:
+                results = (self.run_task(*item) for item in self.tasks())
+            for group, seconds, error in results:
+                entry = report.setdefault(group, {'tasks': 0, 'seconds': 0.0, 'errors': []})
+                entry['tasks'] += 1
+                entry['seconds'] += seconds
+                if error is not None:
+                    entry['errors'].append(str(error))
+        report['total'] = time.perf_counter() - start
+        return report
+
+
+def warm_in_background():
+    """Warm the cache from a daemon thread, e.g. when a worker starts"""
+    def run():
+        close_old_connections()
+        try:
+            report = CacheWarmer().run()
+            logger.info('Catalog cache warmed in %.1fs', report['total'])
+        except Exception:
+            logger.exception('Warming the catalog cache failed')
+        finally:
+            connections.close_all()
+    threading.Thread(target=run, name='warm catalog cache', daemon=True).start()
@@ -0,0 +1,120 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+
+class CatalogCache:
+    """
+    Versioned cache for the public catalog.
+
+    Every cached entry is tagged with one or more namespaces (products,
+    categories, sizes, reviews, team). The current generation of each tag is
+    embedded in the cache key, so bumping a tag makes every dependent key
+    stale in O(1) without having to know or delete the keys themselves.
+    Stale entries simply age out of the backend. Tags are bumped from the
+    model signals in api/invalidation.py.
+    """
+    PRODUCTS = 'products'
+    CATEGORIES = 'categories'
+    SIZES = 'sizes'
+    REVIEWS = 'reviews'
+    TEAM = 'team'
+    # Bumped only when searchable text changes (see MemorySearchIndex)
+    SEARCH = 'search'
+
+    VERSION_PREFIX = 'catalog_version'
+    MODIFIED_PREFIX = 'catalog_modified'
+    MAX_KEY_LENGTH = 200
+
+    # Tags each public cache entry depends on
+    DEPENDENCIES = {
+        'product_list': (PRODUCTS, CATEGORIES, SIZES),
+        'featured_product_list': (PRODUCTS, CATEGORIES, SIZES),
+        'product_detail': (PRODUCTS, CATEGORIES, SIZES),
+        'product_search': (PRODUCTS, CATEGORIES, SIZES),
+        'category_list_cache_key': (CATEGORIES,),
+        'size_list': (SIZES,),
+        'team_list': (TEAM,),
+        'review_list': (REVIEWS,),
+    }
+
+    @classmethod
+    def version_key(cls, tag):
+        return f'{cls.VERSION_PREFIX}:{tag}'
+
+    @classmethod
+    def versions(cls, tags):
+        """
+        Return {tag: generation} for the given tags in a single round trip.
+        Missing generations are initialised from the clock, so an evicted
+        counter can never resurrect entries written under an older value.
+        """
+        keys = {cls.version_key(tag): tag for tag in tags}
+        found = cache.get_many(list(keys))
+        result = {}
+        for key, tag in keys.items():
+            version = found.get(key)
+            if version is None:
+                cache.add(key, time.time_ns(), timeout=None)
+                version = cache.get(key)
+            result[tag] = version
+        return result
+
+    @classmethod
+    def bump(cls, *tags):
+        """Invalidate every entry depending on any of the given tags."""
+        now = time.time()
+        for tag in tags:
+            key = cls.version_key(tag)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, time.time_ns(), timeout=None)
+        cache.set_many({f'{cls.MODIFIED_PREFIX}:{tag}': now for tag in tags}, timeout=None)
+
+    @classmethod
+    def last_modified(cls, tags):
+        """
+        Epoch seconds of the latest bump of any of the tags. Unknown tags
+        count as modified now, which is always safe for conditional GETs.
+        """
+        keys = [f'{cls.MODIFIED_PREFIX}:{tag}' for tag in tags]
+        found = cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            now = time.time()
+            for key in missing:
+                cache.add(key, now, timeout=None)
+            found.update(cache.get_many(missing))
+        return max(found.values())
+
+    @classmethod
+    def etag(cls, name, *parts):
+        """Strong validator for an entry, derived from the tag versions only."""
+        return hashlib.md5(cls.make_key(name, *parts).encode()).hexdigest()
+
+    @classmethod
+    def make_key(cls, name, *parts):
+        """
+        Build the cache key for a registered entry, e.g.
+        make_key('product_detail', pk). Compute the key once before
+        building the value, so data read before a concurrent bump is stored
+        under the old (already stale) key.
+        """
+        return cls._build_key(name, parts, cls.versions(cls.DEPENDENCIES[name]))
+
+    @classmethod
+    def make_keys(cls, name, parts_list):
+        """make_key for many entries of the same name with one version lookup."""
+        versions = cls.versions(cls.DEPENDENCIES[name])
+        return [cls._build_key(name, parts, versions) for parts in parts_list]
+
+    @classmethod
+    def _build_key(cls, name, parts, versions):
+        stamp = '.'.join(f'{tag}{versions[tag]}' for tag in cls.DEPENDENCIES[name])
+        key = ':'.join(['catalog', name, *(str(part) for part in parts), stamp])
+        if len(key) > cls.MAX_KEY_LENGTH:
+            # Keep keys memcached-safe when cursors and filters pile up
+            key = f'catalog:{name}:{hashlib.md5(key.encode()).hexdigest()}'
+        return key
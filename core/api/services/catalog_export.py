@@ -0,0 +1,291 @@
+"""
+Static JSON snapshots of the public catalog endpoints.
+
+Files are written under CATALOG_SNAPSHOT_ROOT so nginx or a CDN can serve
+the read-only catalog without reaching Django:
+
+    categories.json              GET /api/categories/
+    featured-products.json       GET /api/featured-products/
+    products/page-<n>.json       GET /api/products/, MAX_PAGE_SIZE per page
+    products/<id>.json           GET /api/products/<id>/
+    manifest.json                version and sha256 of every file
+
+Every file is rendered once into its identity, .gz and (when brotli is
+installed) .br variants, for gzip_static / brotli_static. A file is only
+rewritten when its content changed, and always atomically.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; exports there aren't serialised
+    fcntl = None
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import Category, ProductCard
+from api.services.product_cards import absolutize
+from api.services.response_cache import render_payload
+
+
+logger = logging.getLogger(__name__)
+
+FEATURED_COUNT = 8
+SUFFIXES = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+
+_pending = threading.local()
+
+
+def build_url(url):
+    return settings.CATALOG_SNAPSHOT_BASE_URL.rstrip('/') + url if settings.CATALOG_SNAPSHOT_BASE_URL else url
+
+
+class CatalogExporter:
+    """
+    Writes snapshot files and keeps track of their hashes in the manifest.
+    Use as a context manager: the manifest is saved (and its version
+    bumped) on exit when any file changed. Exporters of all processes
+    sharing the root take turns through a lock file held for the whole
+    context, so each one reads the manifest the previous one saved.
+    """
+    LOCK_FILE = '.export.lock'
+
+    def __init__(self, root=None):
+        self.root = Path(root or settings.CATALOG_SNAPSHOT_ROOT)
+        self.written = 0
+        self.removed = 0
+
+    def __enter__(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.lock = open(self.root / self.LOCK_FILE, 'a')
+        if fcntl is not None:
+            fcntl.flock(self.lock, fcntl.LOCK_EX)
+        try:
+            self.manifest = json.loads((self.root / 'manifest.json').read_text())
+        except (OSError, ValueError):
+            self.manifest = {'version': 0, 'files': {}}
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and (self.written or self.removed):
+                self.manifest['version'] += 1
+                self.manifest['generated_at'] = timezone.now().isoformat()
+                self.replace('manifest.json', json.dumps(self.manifest, indent=2).encode())
+        finally:
+            # Closing the file releases the lock
+            self.lock.close()
+
+    def replace(self, name, content):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            # mkstemp creates the file private; the web server has to read it
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def write(self, name, payload):
+        encodings = render_payload(payload)
+        digest = hashlib.sha256(encodings['identity']).hexdigest()
+        if self.manifest['files'].get(name) == digest and (self.root / name).exists():
+            return False
+        for coding, suffix in SUFFIXES.items():
+            if coding in encodings:
+                self.replace(name + suffix, encodings[coding])
+            else:
+                # Too small to compress: drop a stale variant
+                (self.root / (name + suffix)).unlink(missing_ok=True)
+        self.manifest['files'][name] = digest
+        self.written += 1
+        return True
+
+    def remove(self, name):
+        if self.manifest['files'].pop(name, None) is None:
+            return
+        for suffix in SUFFIXES.values():
+            (self.root / (name + suffix)).unlink(missing_ok=True)
+        self.removed += 1
+
+    def has(self, name):
+        return name in self.manifest['files']
+
+    # Endpoints
+
+    def export_categories(self):
+        from api.serializers import CategorySerializer
+        categories = CategorySerializer(Category.objects.all(), many=True).data
+        self.write('categories.json', {
+            'status': 'success',
+            'message': 'Categories fetched successfully',
+            'categories': absolutize(categories, build_url),
+        })
+
+    def export_featured(self):
+        cards = ProductCard.objects.only('id', 'card').order_by('-created_at', '-id')[:FEATURED_COUNT]
+        self.write('featured-products.json', {
+            'status': 'success',
+            'message': 'Products fetched successfully',
+            'products': [absolutize(card.card, build_url) for card in cards],
+        })
+
+    def export_page(self, number, cards, has_more):
+        self.write(f'products/page-{number}.json', {
+            'status': 'success',
+            'message': 'Products fetched successfully',
+            'products': [absolutize(card, build_url) for card in cards],
+            'next': f'page-{number + 1}.json' if has_more else None,
+            'has_more': has_more,
+        })
+
+    def export_pages(self, numbers=None):
+        """Rewrite the given 1-based list pages, or all of them"""
+        page_size = settings.MAX_PAGE_SIZE
+        cards = ProductCard.objects.order_by('-created_at', '-id')
+        total = cards.count()
+        pages = max(1, -(-total // page_size))
+        if numbers is None:
+            rows = cards.values_list('card', flat=True).iterator(chunk_size=page_size)
+            for number in range(1, pages + 1):
+                page = [row for _, row in zip(range(page_size), rows)]
+                self.export_page(number, page, number < pages)
+            # Pages past the end after products were deleted
+            for name in list(self.manifest['files']):
+                if name.startswith('products/page-') and int(name[14:-5]) > pages:
+                    self.remove(name)
+        else:
+            for number in sorted(n for n in set(numbers) if n <= pages):
+                offset = (number - 1) * page_size
+                page = list(cards.values_list('card', flat=True)[offset:offset + page_size])
+                self.export_page(number, page, number < pages)
+
+    def export_details(self, product_ids=None):
+        """Rewrite detail files of the given products, or of all of them"""
+        cards = ProductCard.objects.values_list('id', 'detail')
+        if product_ids is not None:
+            cards = cards.filter(id__in=product_ids)
+        found = set()
+        for pk, detail in cards.iterator(chunk_size=500):
+            found.add(str(pk))
+            self.write(f'products/{pk}.json', {
+                'status': 'success',
+                'message': 'Product details fetched successfully',
+                'product': absolutize(detail, build_url),
+            })
+        if product_ids is None:
+            gone = [name for name in self.manifest['files']
+                    if name.startswith('products/') and not name.startswith('products/page-')
+                    and name[9:-5] not in found]
+        else:
+            gone = [f'products/{pk}.json' for pk in map(str, product_ids) if pk not in found]
+        for name in gone:
+            self.remove(name)
+
+    def page_of(self, card):
+        """1-based list page `card` is shown on, None if it can't be placed"""
+        if card.created_at is None:
+            return None
+        before = ProductCard.objects.filter(
+            Q(created_at__gt=card.created_at) | Q(created_at=card.created_at, id__gt=card.id)
+        ).count()
+        return before // settings.MAX_PAGE_SIZE + 1
+
+    def export_products(self, product_ids):
+        """
+        Refresh the files affected by changes to `product_ids`: their
+        detail files, the featured list, and the list pages. Edits only
+        touch the pages holding the products; added or removed products
+        shift every later page, so all pages are rebuilt (unchanged files
+        are still skipped).
+        """
+        product_ids = {str(pk) for pk in product_ids}
+        cards = list(ProductCard.objects.filter(id__in=product_ids).only('id', 'created_at'))
+        shifted = len(cards) != len(product_ids) or any(
+            not self.has(f'products/{card.id}.json') for card in cards
+        )
+        pages = None if shifted else [self.page_of(card) for card in cards]
+        if pages is not None and None in pages:
+            pages = None
+
+        self.export_details(product_ids)
+        self.export_featured()
+        self.export_pages(pages)
+
+    def export_all(self):
+        self.export_categories()
+        self.export_featured()
+        self.export_pages()
+        self.export_details()
+
+
+def export_catalog(root=None):
+    """Full export; returns (files written, files removed)"""
+    with CatalogExporter(root) as exporter:
+        exporter.export_all()
+    return exporter.written, exporter.removed
+
+
+def _ensure_pending():
+    if not hasattr(_pending, 'product_ids'):
+        _pending.product_ids, _pending.categories, _pending.deferred = set(), False, False
+
+
+def flush_export():
+    _ensure_pending()
+    product_ids, categories = _pending.product_ids, _pending.categories
+    _pending.product_ids, _pending.categories = set(), False
+    if not (product_ids or categories):
+        return
+    with CatalogExporter() as exporter:
+        if categories:
+            exporter.export_categories()
+        if product_ids:
+            exporter.export_products(product_ids)
+
+
+def schedule_export(product_ids=(), categories=False):
+    """
+    Re-export the snapshots touched by a write once it is committed, when
+    CATALOG_SNAPSHOTS is on. Calls made during one transaction are merged
+    into a single export; during a request (see deferred_exports) they are
+    merged until the response is ready, since outside an atomic block
+    every signal would otherwise export on its own.
+    """
+    if not settings.CATALOG_SNAPSHOTS:
+        return
+    _ensure_pending()
+    _pending.product_ids.update(str(pk) for pk in product_ids)
+    _pending.categories = _pending.categories or categories
+    if not _pending.deferred:
+        transaction.on_commit(flush_export)
+
+
+@contextmanager
+def deferred_exports():
+    """Merge the exports scheduled inside the block and run them at its end"""
+    _ensure_pending()
+    _pending.deferred = True
+    try:
+        yield
+    finally:
+        _pending.deferred = False
+        try:
+            flush_export()
+        except Exception:
+            # The write itself succeeded; the next export catches up
+            logger.exception('Exporting catalog snapshots failed')
@@ -1,26 +1,38 @@
-from django.core.mail import send_mail
+from datetime import timedelta
+from django.core.mail import send_mail, get_connection, EmailMessage
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
+from django.utils import timezone
+from django.db import connection as db_connection, transaction
 from django.conf import settings
+from api.models import OutgoingEmail
 
 class EmailService:
     @staticmethod
-    def send_contact_email(contact):
+    def build_contact_email(contact):
         """
-        Send email notification for contact form submissions
+        Return (subject, message, recipients) for a contact form submission
         """
-        try:
-            subject = f'New Contact Form Submission from {contact.name}'
-            message = f'''
+        subject = f'New Contact Form Submission from {contact.name}'
+        message = f'''
             Name: {contact.name}
             Email: {contact.email}
             Message: {contact.message}
             '''
+        return subject, message, [settings.ADMIN_EMAIL]
+
+    @staticmethod
+    def send_contact_email(contact):
+        """
+        Send email notification for contact form submissions
+        """
+        try:
+            subject, message, recipients = EmailService.build_contact_email(contact)
             send_mail(
                 subject,
                 message,
                 settings.EMAIL_HOST_USER,
-                [settings.ADMIN_EMAIL],
+                recipients,
                 fail_silently=False,
             )
             return True
@@ -28,6 +40,18 @@ class EmailService:
             print(f"Email sending failed: {str(e)}")
             return False
 
+    @staticmethod
+    def queue_contact_email(contact):
+        """
+        Queue the contact form notification for the outbox worker
+        """
+        try:
+            EmailService.queue_mail(*EmailService.build_contact_email(contact))
+            return True
+        except Exception as e:
+            print(f"Email queueing failed: {str(e)}")
+            return False
+
     @staticmethod
     def send_inquiry_email(inquiry):
         """
@@ -66,27 +90,27 @@ class EmailService:
             return False
 
     @staticmethod
-    def send_order_receipt(order, customer_email=None):
+    def build_order_receipts(order, customer_email=None):
         """
-        Send order receipt notification to admin and optionally to customer
+        Return [(subject, message, recipients)] for the admin notification
+        and, if an email is provided, the customer confirmation
         """
-        try:
-            # Create a formatted list of items in the order
-            items_list = []
-            
-            for item in order.items.all():
-                product = item.product
-                item_total = product.price * item.quantity
-                
-                items_list.append(
-                    f"- {product.title} x {item.quantity} = ৳{item_total:,}"
-                )
+        # Create a formatted list of items in the order
+        items_list = []
+        
+        for item in order.items.all():
+            product = item.product
+            item_total = (product.price or 0) * item.quantity
             
-            items_formatted = "\n".join(items_list)
-            
-            # Admin notification
-            admin_subject = f'New Order Received - Order #{str(order.id)[:8]}'
-            admin_message = f'''
+            items_list.append(
+                f"- {product.title} x {item.quantity} = ৳{item_total:,}"
+            )
+        
+        items_formatted = "\n".join(items_list)
+        
+        # Admin notification
+        admin_subject = f'New Order Received - Order #{str(order.id)[:8]}'
+        admin_message = f'''
             A new order has been received:
             
             Order ID: {str(order.id)[:8]}
@@ -98,21 +122,12 @@ class EmailService:
             Items Ordered:
             {items_formatted}
             '''
-            
-            # Send to admin email
-            admin_email_sent = send_mail(
-                admin_subject,
-                admin_message,
-                settings.EMAIL_HOST_USER,
-                [settings.ADMIN_EMAIL],
-                fail_silently=False,
-            )
-            
-            # Send to customer if email is provided
-            customer_email_sent = True
-            if customer_email:
-                customer_subject = f'Your Order Confirmation - Order #{str(order.id)[:8]}'
-                customer_message = f'''
+        emails = [(admin_subject, admin_message, [settings.ADMIN_EMAIL])]
+        
+        # Send to customer if email is provided
+        if customer_email:
+            customer_subject = f'Your Order Confirmation - Order #{str(order.id)[:8]}'
+            customer_message = f'''
                 Dear {order.customer_name},
                 
                 Thank you for your order! We've received your order and it's being processed.
@@ -140,16 +155,127 @@ class EmailService:
                 Regards,
                 Khadijah Customer Service
                 '''
-                
-                customer_email_sent = send_mail(
-                    customer_subject,
-                    customer_message,
+            emails.append((customer_subject, customer_message, [customer_email]))
+        return emails
+
+    @staticmethod
+    def send_order_receipt(order, customer_email=None):
+        """
+        Send order receipt notification to admin and optionally to customer
+        """
+        try:
+            sent = True
+            for subject, message, recipients in EmailService.build_order_receipts(order, customer_email):
+                sent = send_mail(
+                    subject,
+                    message,
                     settings.EMAIL_HOST_USER,
-                    [customer_email],
+                    recipients,
                     fail_silently=False,
-                )
-            
-            return admin_email_sent and customer_email_sent
+                ) and sent
+            return sent
         except Exception as e:
             print(f"Order receipt email sending failed: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+
+    @staticmethod
+    def queue_order_receipt(order, customer_email=None):
+        """
+        Queue the order receipts for the outbox worker
+        """
+        try:
+            for subject, message, recipients in EmailService.build_order_receipts(order, customer_email):
+                EmailService.queue_mail(subject, message, recipients)
+            return True
+        except Exception as e:
+            print(f"Order receipt email queueing failed: {str(e)}")
+            return False
+
+    @staticmethod
+    def queue_mail(subject, message, recipients):
+        """
+        Store a message in the outbox; send_queued_emails delivers it
+        """
+        return OutgoingEmail.objects.create(
+            subject=subject,
+            body=message,
+            from_email=settings.EMAIL_HOST_USER,
+            recipients=list(recipients),
+        )
+
+    @staticmethod
+    def deliver_queued(batch_size=50, max_attempts=5, retry_delay=60):
+        """
+        Send up to batch_size due messages over a single backend
+        connection. Failed messages are retried with exponential backoff
+        (retry_delay * 2 ** attempts seconds) and marked failed after
+        max_attempts; when no connection can be opened, every message in
+        the batch counts as failed. Returns (sent, failed) counts.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            due = OutgoingEmail.objects.filter(
+                status=OutgoingEmail.STATUS_PENDING,
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at')
+            if db_connection.features.has_select_for_update_skip_locked:
+                # Lets several workers drain the outbox without double sends
+                due = due.select_for_update(skip_locked=True)
+            emails = list(due[:batch_size])
+            if not emails:
+                return 0, 0
+            # Push the claimed rows into the future so a crashed worker's
+            # batch is retried later instead of being stuck
+            claimed_until = now + timedelta(seconds=retry_delay)
+            OutgoingEmail.objects.filter(id__in=[email.id for email in emails]).update(
+                next_attempt_at=claimed_until
+            )
+            for email in emails:
+                email.next_attempt_at = claimed_until
+
+        def record_failure(email, error):
+            email.attempts += 1
+            email.last_error = str(error)
+            if email.attempts >= max_attempts:
+                email.status = OutgoingEmail.STATUS_FAILED
+            else:
+                email.next_attempt_at = timezone.now() + timedelta(
+                    seconds=retry_delay * 2 ** email.attempts
+                )
+
+        sent = failed = 0
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            # Could not connect: counts as a failed attempt for the whole batch
+            for email in emails:
+                record_failure(email, e)
+            failed = len(emails)
+        else:
+            try:
+                for email in emails:
+                    try:
+                        EmailMessage(
+                            email.subject,
+                            email.body,
+                            email.from_email,
+                            email.recipients,
+                            connection=connection,
+                        ).send()
+                    except Exception as e:
+                        record_failure(email, e)
+                        failed += 1
+                    else:
+                        email.attempts += 1
+                        email.status = OutgoingEmail.STATUS_SENT
+                        email.sent_at = timezone.now()
+                        email.last_error = ''
+                        sent += 1
+            finally:
+                connection.close()
+
+        OutgoingEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+        return sent, failed
@@ -0,0 +1,195 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import ProductImage
+from api.services.image_renditions import EXTENSIONS, available_formats, render_renditions
+from api.services.media_store import hash_file, store_content_addressed
+
+
+RENDITIONS_DIR = 'product_images/renditions'
+
+_executor = None
+
+
+def get_executor():
+    """Process pool shared by every batch in this process"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESSING_WORKERS or None)
+    return _executor
+
+
+def render_many(originals):
+    """
+    Render the renditions of several originals concurrently, so a batch
+    takes about as long as its slowest image. Returns one result per
+    original, or the exception raised while rendering it.
+    """
+    args = (dict(settings.IMAGE_RENDITIONS), available_formats(), settings.IMAGE_OPTIMIZATION['QUALITY'])
+
+    def render(data):
+        try:
+            return render_renditions(data, *args)
+        except Exception as e:
+            return e
+
+    if len(originals) <= 1:
+        return [render(data) for data in originals]
+
+    global _executor
+    try:
+        futures = [get_executor().submit(render_renditions, data, *args) for data in originals]
+    except (BrokenProcessPool, OSError, RuntimeError):
+        _executor = None
+        return [render(data) for data in originals]
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except BrokenProcessPool:
+            _executor = None
+            results.append(None)
+        except Exception as e:
+            results.append(e)
+    # A dead pool loses its work; redo those images in this process
+    return [render(data) if result is None else result for data, result in zip(originals, results)]
+
+
+def store_renditions(product_image, rendered):
+    """
+    Write rendered files to storage and save their paths on the image as
+    {name: {'width': w, 'height': h, 'jpeg': path, 'webp': path, ...}},
+    along with the inline placeholder and dominant colour.
+    """
+    renditions = {}
+    for name, rendition in rendered['renditions'].items():
+        entry = {'width': rendition['width'], 'height': rendition['height']}
+        for fmt, content in rendition['files'].items():
+            path = f'{RENDITIONS_DIR}/{product_image.id}/{name}.{EXTENSIONS[fmt]}'
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            entry[fmt.lower()] = default_storage.save(path, ContentFile(content))
+        renditions[name] = entry
+
+    product_image.renditions = renditions
+    product_image.placeholder = rendered['placeholder']
+    product_image.dominant_color = rendered['dominant_color']
+    product_image.processed_at = timezone.now()
+    product_image.processing_error = ''
+    # Saving through the model fires post_save, which refreshes the catalog cache
+    product_image.save(update_fields=[
+        'renditions', 'placeholder', 'dominant_color', 'processed_at', 'processing_error'
+    ])
+
+
+def read_original(product_image):
+    with product_image.image.open('rb') as f:
+        return f.read()
+
+
+def process_images(product_images):
+    """
+    Generate and store the renditions of several uploads. Returns
+    (processed, failed). Images that cannot be decoded are marked processed
+    and keep the error, so they are not retried forever.
+    """
+    processed = failed = 0
+    product_images = list(product_images)
+    originals = []
+    for product_image in product_images:
+        try:
+            originals.append(read_original(product_image))
+        except Exception as e:
+            originals.append(e)
+
+    readable = [data for data in originals if not isinstance(data, Exception)]
+    rendered = iter(render_many(readable))
+    for product_image, data in zip(product_images, originals):
+        result = data if isinstance(data, Exception) else next(rendered)
+        if isinstance(result, Exception):
+            print(f"Image processing failed for {product_image.id}: {str(result)}")
+            product_image.processed_at = timezone.now()
+            product_image.processing_error = str(result) or type(result).__name__
+            product_image.save(update_fields=['processed_at', 'processing_error'])
+            failed += 1
+        else:
+            store_renditions(product_image, result)
+            processed += 1
+    return processed, failed
+
+
+def process_image(product_image):
+    """Generate and store all renditions of one uploaded image"""
+    return process_images([product_image])
+
+
+def pending_images():
+    # Images rendered before placeholders existed are picked up again,
+    # unless that already failed once
+    return ProductImage.objects.filter(
+        Q(processed_at__isnull=True)
+        | Q(placeholder='', renditions__has_key='detail', processing_error='')
+    ).exclude(image='').exclude(image__isnull=True)
+
+
+def process_pending(batch_size=20):
+    """Process up to batch_size unprocessed uploads in parallel"""
+    return process_images(pending_images().order_by('id')[:batch_size])
+
+
+def create_product_images(product, images_data):
+    """
+    Create all images of one admin request with a single bulk INSERT and
+    attach them with a single M2M add. Uploads are content addressed: a
+    file whose bytes were uploaded before reuses the existing ProductImage
+    row (and its renditions) instead of creating a new one. Renditions of
+    new uploads are generated together, in parallel, after commit unless
+    IMAGE_PROCESSING_ASYNC leaves them to the process_images worker.
+
+    images_data is a list of {'image': file} / {'image_url': url} dicts.
+    Returns the attached images.
+    """
+    if not images_data:
+        return []
+
+    uploads = {}
+    images = []
+    for image_data in images_data:
+        image = ProductImage(**image_data)
+        image.clean()
+        if image.image:
+            image.content_hash = hash_file(image.image.file)
+            if image.content_hash in uploads:
+                continue
+            uploads[image.content_hash] = image
+        images.append(image)
+
+    existing = {
+        image.content_hash: image
+        for image in ProductImage.objects.filter(content_hash__in=list(uploads))
+    }
+    new_images = []
+    for index, image in enumerate(images):
+        if image.content_hash in existing:
+            images[index] = existing[image.content_hash]
+            continue
+        if image.image:
+            name, _ = store_content_addressed(image.image, image.content_hash)
+            image.image = name
+        new_images.append(image)
+
+    ProductImage.objects.bulk_create(new_images)
+    product.images.add(*images)
+
+    pending = [image for image in new_images if image.image]
+    if pending and not settings.IMAGE_PROCESSING_ASYNC:
+        transaction.on_commit(lambda: process_images(pending))
+    return images
@@ -0,0 +1,94 @@
+"""
+Pure Pillow rendering helpers.
+
+Nothing here touches Django, so these functions can run in worker
+processes regardless of the multiprocessing start method.
+"""
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+
+# Longest side of the inline preview shown while the real image loads
+PLACEHOLDER_SIZE = 20
+
+# Pillow format -> file extension
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'WEBP': 'webp',
+    'AVIF': 'avif',
+}
+
+
+def available_formats():
+    """JPEG plus whichever modern formats this Pillow build can encode"""
+    Image.init()
+    return [fmt for fmt in EXTENSIONS if fmt in Image.SAVE]
+
+
+def save_options(fmt, quality):
+    if fmt == 'JPEG':
+        return {'quality': quality, 'optimize': True, 'progressive': True}
+    if fmt == 'WEBP':
+        return {'quality': quality, 'method': 4}
+    # AVIF reaches JPEG-like fidelity at much lower quality settings
+    return {'quality': max(quality - 30, 30)}
+
+
+def flatten(img):
+    # JPEG has no alpha channel: composite transparent images onto white
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def render_placeholder(img):
+    """Tiny blurred JPEG preview as a data: URI, well under 1 KB"""
+    preview = img.copy()
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.BOX)
+    output = BytesIO()
+    preview.save(output, format='JPEG', quality=40, optimize=True)
+    return 'data:image/jpeg;base64,' + base64.b64encode(output.getvalue()).decode('ascii')
+
+
+def dominant_color(img):
+    """Most common colour of a small palette-reduced copy, as #rrggbb"""
+    small = img.copy()
+    small.thumbnail((64, 64))
+    quantized = small.quantize(colors=5)
+    palette = quantized.getpalette()
+    _, index = max(quantized.getcolors())
+    r, g, b = palette[index * 3:index * 3 + 3]
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def render_renditions(data, sizes, formats, quality):
+    """
+    Decode an image once and encode every rendition plus its placeholder.
+
+    Returns {'renditions': {name: {'width': w, 'height': h, 'files': {fmt: bytes}}},
+    'placeholder': data URI, 'dominant_color': '#rrggbb'}.
+    """
+    img = Image.open(BytesIO(data))
+    img = flatten(ImageOps.exif_transpose(img))
+
+    renditions = {}
+    for name, max_size in sizes.items():
+        resized = img.copy()
+        # thumbnail() never upscales, small originals are kept as they are
+        resized.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        files = {}
+        for fmt in formats:
+            output = BytesIO()
+            resized.save(output, format=fmt, **save_options(fmt, quality))
+            files[fmt] = output.getvalue()
+        renditions[name] = {'width': resized.width, 'height': resized.height, 'files': files}
+    return {
+        'renditions': renditions,
+        'placeholder': render_placeholder(img),
+        'dominant_color': dominant_color(img),
+    }
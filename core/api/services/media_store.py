@@ -0,0 +1,68 @@
+import hashlib
+import os
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def hash_file(f):
+    """SHA-256 hex digest of a file object, leaving it rewound"""
+    f.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(upload_to, digest, original_name):
+    """e.g. product_images/ab/ab12....jpg"""
+    extension = os.path.splitext(original_name)[1].lower()
+    return f"{upload_to.rstrip('/')}/{digest[:2]}/{digest}{extension}"
+
+
+def store_content_addressed(field_file, digest=None):
+    """
+    Store a new upload under a name derived from its content hash, reusing
+    the existing file when the same bytes were uploaded before. Returns
+    (name, digest); the caller points the model field at `name`.
+    """
+    if digest is None:
+        digest = hash_file(field_file.file)
+    name = content_name(field_file.field.upload_to, digest, field_file.name)
+    storage = field_file.storage
+    if not storage.exists(name):
+        field_file.file.seek(0)
+        name = storage.save(name, field_file.file)
+    return name, digest
+
+
+def dedupe_upload(instance, field_name='image'):
+    """
+    pre_save helper: if `field_name` holds a fresh upload, swap it for the
+    content-addressed copy and record its hash on `content_hash`.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file or getattr(field_file, '_committed', True):
+        return
+    name, digest = store_content_addressed(field_file)
+    # Assigning the stored name marks the file as committed
+    setattr(instance, field_name, name)
+    instance.content_hash = digest
+
+
+def walk_storage(storage, path, exclude=()):
+    """
+    Yield the name of every file below `path`, one directory at a time,
+    skipping the directories listed in `exclude`.
+    """
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for name in sorted(files):
+        yield f'{path}/{name}'
+    for directory in sorted(directories):
+        directory = f'{path}/{directory}'
+        if directory not in exclude:
+            yield from walk_storage(storage, directory, exclude)
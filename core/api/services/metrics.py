@@ -0,0 +1,159 @@
+"""
+In-process request metrics.
+
+RequestMetricsMiddleware opens a RequestStats for every request; views and
+services add to it through record_cache() and timed(). Finished requests
+are aggregated per endpoint into histograms that MetricsView renders in
+the Prometheus text format. Each worker process keeps its own numbers.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    """Counters for the request being handled"""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timings = {}  # name -> seconds, e.g. {'serialize': 0.004}
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: count and time every query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+_current = ContextVar('request_stats', default=None)
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_cache(hits=0, misses=0):
+    stats = _current.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the wall time of the block to the current request's `name` timing.
+    Queries run inside the block (e.g. lazy prefetches evaluated by a
+    serializer) are already reported as db time and are left out.
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start, db_start = time.perf_counter(), stats.db_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start - (stats.db_time - db_start)
+        stats.timings[name] = stats.timings.get(name, 0.0) + max(elapsed, 0.0)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class MetricsRegistry:
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Total time spent handling the request', LATENCY_BUCKETS),
+        'http_request_db_queries': ('SQL queries executed per request', QUERY_BUCKETS),
+        'http_request_db_duration_seconds': ('Time spent in SQL queries per request', LATENCY_BUCKETS),
+        'http_request_serialize_duration_seconds': ('Time spent serializing and rendering per request', LATENCY_BUCKETS),
+    }
+    COUNTERS = {
+        'http_requests_total': 'Requests handled',
+        'http_request_cache_lookups_total': 'Catalog cache lookups',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._counters = {name: {} for name in self.COUNTERS}
+
+    def _observe(self, name, labels, value):
+        histogram = self._histograms[name].get(labels)
+        if histogram is None:
+            histogram = self._histograms[name][labels] = Histogram(self.HISTOGRAMS[name][1])
+        histogram.observe(value)
+
+    def _increment(self, name, labels, value=1):
+        self._counters[name][labels] = self._counters[name].get(labels, 0) + value
+
+    def observe_request(self, endpoint, method, status_code, stats, total):
+        labels = f'endpoint="{endpoint}",method="{method}"'
+        with self._lock:
+            self._increment('http_requests_total', f'{labels},status="{status_code}"')
+            self._observe('http_request_duration_seconds', labels, total)
+            self._observe('http_request_db_queries', labels, stats.db_queries)
+            self._observe('http_request_db_duration_seconds', labels, stats.db_time)
+            if 'serialize' in stats.timings:
+                self._observe('http_request_serialize_duration_seconds', labels, stats.timings['serialize'])
+            if stats.cache_hits:
+                self._increment('http_request_cache_lookups_total', f'{labels},result="hit"', stats.cache_hits)
+            if stats.cache_misses:
+                self._increment('http_request_cache_lookups_total', f'{labels},result="miss"', stats.cache_misses)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name, help_text in self.COUNTERS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f'{name}{{{labels}}} {value}')
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    lines += histogram.render(name, labels)
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,111 @@
+from uuid import UUID
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+
+from api.models import Product, ProductCard, ProductImage, Size
+
+
+CARD_FIELDS = ['category_id', 'title', 'price', 'created_at', 'updated_at', 'card', 'detail']
+
+
+def build_card(product):
+    # Imported here: serializers import the models this module is loaded with
+    from api.serializers import ProductDetailSerializer, ProductSerializer
+    return ProductCard(
+        id=product.id,
+        category_id=product.category_id,
+        title=product.title,
+        price=product.price,
+        created_at=product.created_at,
+        updated_at=product.updated_at,
+        card=ProductSerializer(product).data,
+        detail=ProductDetailSerializer(product).data,
+    )
+
+
+def refresh_product_cards(product_ids):
+    """
+    Rebuild the cards of the given products with a fixed number of queries,
+    dropping the cards of products that no longer exist.
+    """
+    product_ids = list({UUID(str(pk)) for pk in product_ids})
+    if not product_ids:
+        return
+    products = Product.objects.filter(id__in=product_ids).select_related('category').prefetch_related(
+        Prefetch('size', queryset=Size.objects.only('id', 'size')),
+        Prefetch('images', queryset=ProductImage.objects.only(
+            'id', 'image', 'image_url', 'renditions', 'placeholder', 'dominant_color'
+        ))
+    )
+    cards = [build_card(product) for product in products]
+    ProductCard.objects.bulk_create(
+        cards, update_conflicts=True, unique_fields=['id'], update_fields=CARD_FIELDS
+    )
+    found = {card.id for card in cards}
+    gone = [pk for pk in product_ids if pk not in found]
+    if gone:
+        ProductCard.objects.filter(id__in=gone).delete()
+
+
+def schedule_refresh(product_ids):
+    """
+    Refresh after commit, before the catalog cache version is bumped, and
+    then re-export the static snapshots built from the cards
+    """
+    # catalog_export renders cards, so it imports this module
+    from api.services.catalog_export import schedule_export
+    product_ids = list(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_product_cards(product_ids))
+        schedule_export(product_ids)
+
+
+def delete_product_images(images):
+    """
+    Delete a queryset of ProductImages and refresh the cards of the products
+    still showing them. Deleting removes the through rows without an
+    m2m_changed signal, so the products are looked up first, with one query
+    for the whole batch. Callers deleting only detached images can delete
+    them directly.
+    """
+    ids = list(images.values_list('id', flat=True))
+    schedule_refresh(
+        Product.images.through.objects.filter(productimage_id__in=ids)
+        .values_list('product_id', flat=True).distinct()
+    )
+    return ProductImage.objects.filter(id__in=ids).delete()
+
+
+def rebuild_product_cards(batch_size=500):
+    """Rebuild every card, e.g. after bulk inserts that sent no signals"""
+    total = 0
+    last = None
+    while True:
+        ids = Product.objects.order_by('id')
+        if last is not None:
+            ids = ids.filter(id__gt=last)
+        ids = list(ids.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        refresh_product_cards(ids)
+        total += len(ids)
+        last = ids[-1]
+    ProductCard.objects.exclude(id__in=Product.objects.values('id')).delete()
+    return total
+
+
+def absolutize(payload, build_url):
+    """
+    Copy of a stored card with site-relative media URLs passed through
+    `build_url` (e.g. request.build_absolute_uri), as the serializers
+    would have rendered them for a request.
+    """
+    if isinstance(payload, dict):
+        return {key: absolutize(value, build_url) for key, value in payload.items()}
+    if isinstance(payload, list):
+        return [absolutize(value, build_url) for value in payload]
+    if isinstance(payload, str) and payload.startswith(settings.MEDIA_URL) and build_url is not None:
+        return build_url(payload)
+    return payload
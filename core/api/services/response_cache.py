@@ -0,0 +1,80 @@
+import gzip
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from api.services.metrics import timed
+from api.services.shared_cache import get_or_set
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_SIZE = 1024
+
+
+def render_payload(data):
+    """
+    Render `data` once and return every encoding we can serve:
+    {'identity': bytes, 'gzip': bytes, 'br': bytes}.
+    """
+    body = JSONRenderer().render(data)
+    encodings = {'identity': body}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        encodings['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            encodings['br'] = brotli.compress(body, quality=5)
+    return encodings
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    if '*' in accepted:
+        accepted.update(('gzip', 'br'))
+    return accepted
+
+
+def json_response(request, encodings, status=200):
+    """Serve the best pre-rendered encoding the client accepts."""
+    accepted = accepted_encodings(request)
+    for coding in ('br', 'gzip'):
+        if coding in encodings and coding in accepted:
+            response = HttpResponse(encodings[coding], content_type='application/json', status=status)
+            response['Content-Encoding'] = coding
+            break
+    else:
+        response = HttpResponse(encodings['identity'], content_type='application/json', status=status)
+    if len(encodings) > 1:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def cached_json_response(request, cache_key, build, timeout=300):
+    """
+    Return the rendered bytes cached under `cache_key`, calling `build()`
+    for the payload dict and rendering it on a miss. Hits skip both
+    serialization and JSON encoding; concurrent misses render once, and
+    expired entries are served stale for CACHE_STALE_TIMEOUT seconds while
+    one request re-renders them.
+    """
+    def render():
+        with timed('serialize'):
+            return render_payload(build())
+    return json_response(request, get_or_set(cache_key, render, timeout, settings.CACHE_STALE_TIMEOUT))
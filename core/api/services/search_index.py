@@ -0,0 +1,265 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection, transaction, OperationalError
+
+from api.models import Product
+from api.services.catalog_cache import CatalogCache
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Product fields that make up its indexed text
+INDEXED_FIELDS = {'title', 'description', 'category'}
+
+# Relative weight of each indexed field when ranking
+FIELD_WEIGHTS = {
+    'title': 10.0,
+    'category': 5.0,
+    'description': 1.0,
+}
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+def product_document(product):
+    return {
+        'title': product.title,
+        'description': product.description,
+        'category': product.category.name if product.category_id else '',
+    }
+
+
+class SQLiteSearchIndex:
+    """
+    Inverted index stored in an SQLite FTS5 virtual table and ranked with
+    bm25. The table is created after migrate and written in the same
+    transaction as the product, so it never drifts from the catalog.
+    """
+    TABLE = 'api_product_search'
+
+    @classmethod
+    def table_exists(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name=%s", [cls.TABLE]
+            )
+            return cursor.fetchone() is not None
+
+    def create_table(self):
+        """
+        Create the FTS5 table, returning False if it already exists. Raises
+        OperationalError when SQLite was built without FTS5.
+        """
+        if self.table_exists():
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {self.TABLE} USING fts5("
+                "product_id UNINDEXED, title, category, description, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        return True
+
+    def index(self, product):
+        doc = product_document(product)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLE} WHERE product_id = %s', [str(product.pk)])
+            cursor.execute(
+                f'INSERT INTO {self.TABLE} (product_id, title, category, description) '
+                'VALUES (%s, %s, %s, %s)',
+                [str(product.pk), doc['title'], doc['category'], doc['description']]
+            )
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLE} WHERE product_id = %s', [str(product_id)])
+
+    def rebuild(self):
+        products = Product.objects.select_related('category').only(
+            'id', 'title', 'description', 'category__name'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLE}')
+            rows = []
+            for product in products.iterator(chunk_size=2000):
+                doc = product_document(product)
+                rows.append([str(product.pk), doc['title'], doc['category'], doc['description']])
+                if len(rows) >= 2000:
+                    self._insert_many(cursor, rows)
+                    rows = []
+            if rows:
+                self._insert_many(cursor, rows)
+
+    def _insert_many(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {self.TABLE} (product_id, title, category, description) '
+            'VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+    def search(self, query, limit, offset=0):
+        """Return (ranked product ids, total match count)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+        # Quote every token and prefix-match the last one, so user input can
+        # never be interpreted as FTS5 query syntax
+        match = ' '.join(f'"{token}"' for token in tokens) + '*'
+        weights = ', '.join(str(FIELD_WEIGHTS[field]) for field in ('title', 'category', 'description'))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {self.TABLE} WHERE {self.TABLE} MATCH %s', [match])
+            total = cursor.fetchone()[0]
+            if offset >= total:
+                # Also keeps huge offsets away from SQLite's 64-bit integers
+                return [], total
+            cursor.execute(
+                f'SELECT product_id FROM {self.TABLE} WHERE {self.TABLE} MATCH %s '
+                # bm25() takes one weight per column, the unindexed id included
+                f'ORDER BY bm25({self.TABLE}, 0, {weights}) LIMIT %s OFFSET %s',
+                [match, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()], total
+
+
+class MemorySearchIndex:
+    """
+    In-process inverted index used when FTS5 is unavailable (e.g. on
+    PostgreSQL). It is built from the database on first use and kept up to
+    date by the model signals of the process that performs the write.
+    Other worker processes learn about a write through the SEARCH catalog
+    cache version, which is bumped only when indexed text changes, and
+    rebuild when it moved since they were built.
+    """
+    TAGS = (CatalogCache.SEARCH,)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._versions = None
+        self._postings = defaultdict(dict)  # token -> {product_id: weight}
+        self._documents = {}  # product_id -> set of tokens
+
+    def _ensure_built(self):
+        if not self._built or CatalogCache.versions(self.TAGS) != self._versions:
+            self.rebuild()
+
+    def _add(self, product_id, doc):
+        weights = defaultdict(float)
+        for field, text in doc.items():
+            for token in tokenize(text):
+                weights[token] += FIELD_WEIGHTS[field]
+        for token, weight in weights.items():
+            self._postings[token][product_id] = weight
+        self._documents[product_id] = set(weights)
+
+    def _discard(self, product_id):
+        for token in self._documents.pop(product_id, ()):
+            postings = self._postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+
+    def _invalidate_others(self):
+        transaction.on_commit(lambda: CatalogCache.bump(*self.TAGS))
+
+    def index(self, product):
+        doc = product_document(product)
+        self._invalidate_others()
+        with self._lock:
+            if not self._built:
+                return
+            self._discard(str(product.pk))
+            self._add(str(product.pk), doc)
+
+    def remove(self, product_id):
+        self._invalidate_others()
+        with self._lock:
+            self._discard(str(product_id))
+
+    def rebuild(self):
+        products = Product.objects.select_related('category').only(
+            'id', 'title', 'description', 'category__name'
+        )
+        # Read before the products, so a write committed during the build
+        # triggers another one
+        versions = CatalogCache.versions(self.TAGS)
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            for product in products.iterator(chunk_size=2000):
+                self._add(str(product.pk), product_document(product))
+            self._built = True
+            self._versions = versions
+
+    def _matches(self, token, prefix):
+        if not prefix:
+            return self._postings.get(token, {})
+        matches = {}
+        for term, postings in self._postings.items():
+            if term.startswith(token):
+                for product_id, weight in postings.items():
+                    matches[product_id] = max(matches.get(product_id, 0), weight)
+        return matches
+
+    def search(self, query, limit, offset=0):
+        """Return (ranked product ids, total match count)"""
+        self._ensure_built()
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+        with self._lock:
+            total_docs = len(self._documents) or 1
+            scores = None
+            for position, token in enumerate(tokens):
+                matches = self._matches(token, prefix=position == len(tokens) - 1)
+                idf = math.log(1 + total_docs / (1 + len(matches)))
+                if scores is None:
+                    scores = {pid: weight * idf for pid, weight in matches.items()}
+                else:
+                    scores = {
+                        pid: score + matches[pid] * idf
+                        for pid, score in scores.items() if pid in matches
+                    }
+                if not scores:
+                    return [], 0
+        ranked = sorted(scores, key=lambda pid: (-scores[pid], pid))
+        return ranked[offset:offset + limit], len(ranked)
+
+
+_search_index = None
+
+
+def get_search_index():
+    """
+    Return the FTS5-backed index when the table exists (see
+    create_search_table), otherwise the in-process fallback.
+    """
+    global _search_index
+    if _search_index is None:
+        if connection.vendor == 'sqlite' and SQLiteSearchIndex.table_exists():
+            _search_index = SQLiteSearchIndex()
+        else:
+            _search_index = MemorySearchIndex()
+    return _search_index
+
+
+def create_search_table():
+    """
+    Create and fill the FTS5 table on SQLite builds that support it.
+    Returns whether the FTS5 index is available.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    index = SQLiteSearchIndex()
+    try:
+        created = index.create_table()
+    except OperationalError:
+        return False
+    if created:
+        index.rebuild()
+    return True
@@ -0,0 +1,124 @@
+"""
+Helpers for the cache shared by all worker processes.
+
+A miss on a hot key used to be rebuilt by every request that saw it at the
+same time, in every worker. get_or_set() lets one request rebuild the value
+while the others wait for it, using an add()-based lock held in the same
+shared cache.
+
+Entries are stored as (value, fresh_until). Their lifetime is jittered so
+keys built together don't all expire in the same second, and entries can
+outlive their freshness by a stale window during which they are still
+served while a single request (or a background thread) rebuilds them.
+"""
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from api.services.metrics import record_cache
+
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = 'lock'
+POLL_INTERVAL = 0.05
+
+
+def lock_key(key):
+    return f'{LOCK_PREFIX}:{key}'
+
+
+def jittered(timeout):
+    """`timeout` spread by ±CACHE_TTL_JITTER (a fraction of it)"""
+    jitter = settings.CACHE_TTL_JITTER
+    return timeout * random.uniform(1 - jitter, 1 + jitter)
+
+
+def store(key, value, timeout, stale_timeout=0):
+    ttl = jittered(timeout)
+    cache.set(key, (value, time.time() + ttl), int(ttl + stale_timeout) + 1)
+    return value
+
+
+def revalidate(key, build, timeout, stale_timeout):
+    """
+    Rebuild a stale entry; the caller holds the lock. Returns the new value,
+    or None when the rebuild failed or runs in the background.
+    """
+    def rebuild():
+        try:
+            # Another worker may have refreshed it before we got the lock
+            entry = cache.get(key)
+            if entry is not None and time.time() < entry[1]:
+                return entry[0]
+            return store(key, build(), timeout, stale_timeout)
+        except Exception:
+            # Keep serving the stale value; the next request after the lock
+            # expires tries again
+            logger.exception('Refreshing cache entry %s failed', key)
+            return None
+        finally:
+            cache.delete(lock_key(key))
+
+    if not settings.CACHE_REFRESH_IN_BACKGROUND:
+        return rebuild()
+
+    def run():
+        try:
+            rebuild()
+        finally:
+            connections.close_all()
+    threading.Thread(target=run, name=f'revalidate {key}', daemon=True).start()
+    return None
+
+
+def get_or_set(key, build, timeout=300, stale_timeout=0):
+    """
+    Return the value cached under `key`, calling `build()` and caching its
+    result on a miss. Concurrent misses on the same key build it once: the
+    request holding the lock builds, the others poll for the result. If the
+    lock holder doesn't finish within CACHE_LOCK_TIMEOUT seconds (or died),
+    the lock expires and a waiting request builds the value itself.
+
+    With `stale_timeout`, an entry past its (jittered) `timeout` is kept
+    for that many more seconds. The first request to see it stale rebuilds
+    it, inline or in a background thread (CACHE_REFRESH_IN_BACKGROUND);
+    every other request is served the stale value meanwhile.
+
+    `build()` must not return None, which is indistinguishable from a miss.
+    The lock relies on an atomic add(): Redis, LocMem and
+    api.cache_backends.FileBasedCache provide one.
+    """
+    entry = cache.get(key)
+    record_cache(hits=entry is not None, misses=entry is None)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() >= fresh_until and cache.add(lock_key(key), 1, settings.CACHE_LOCK_TIMEOUT):
+            fresh = revalidate(key, build, timeout, stale_timeout)
+            if fresh is not None:
+                return fresh
+        return value
+
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while True:
+        if cache.add(lock_key(key), 1, settings.CACHE_LOCK_TIMEOUT):
+            try:
+                # The previous lock holder may have stored it meanwhile
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+                return store(key, build(), timeout, stale_timeout)
+            finally:
+                cache.delete(lock_key(key))
+        if time.monotonic() >= deadline:
+            # Don't keep the client waiting on a lock that outlived its holder
+            return store(key, build(), timeout, stale_timeout)
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
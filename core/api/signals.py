@@ -1,68 +1,125 @@
-from django.db.models.signals import pre_save
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, post_migrate, m2m_changed
 from django.dispatch import receiver
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
-from api.models import Product, ProductImage
-
-@receiver(pre_save, sender=Product)
-def optimize_image(sender, instance, **kwargs):
-    # The Product model no longer has a direct image field
-    # It uses a ManyToMany relationship with ProductImage
-    
-    # The image optimization will be handled after the product is saved
-    # and when ProductImage instances are created/updated
-    pass
+from api.models import Product, ProductCard, ProductImage, Category, Size, Stuff
+from api.services.media_store import dedupe_upload
+from api.services.image_pipeline import process_image
+from api.services.search_index import INDEXED_FIELDS, get_search_index, create_search_table
+from api.services.product_cards import schedule_refresh, rebuild_product_cards
+from api.services.catalog_export import schedule_export
 
 @receiver(pre_save, sender=ProductImage)
-def optimize_product_image(sender, instance, **kwargs):
-    if instance.image:
-        # Open the uploaded image
-        img = Image.open(instance.image)
-        
-        # Convert to RGB if image is in RGBA mode
-        if img.mode == 'RGBA':
-            img = img.convert('RGB')
-        
-        # Set maximum dimensions
-        max_size = (800, 800)  # You can adjust these dimensions
-        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Create a BytesIO object to store the optimized image
-        output = BytesIO()
-        
-        # Save the image with optimal quality (80% is usually a good balance)
-        img.save(output, format='JPEG', quality=80, optimize=True)
-        output.seek(0)
-        
-        # Replace the image field with optimized version
-        instance.image = InMemoryUploadedFile(
-            output,
-            'ImageField',
-            f"{instance.image.name.split('.')[0]}.jpg",
-            'image/jpeg',
-            sys.getsizeof(output),
-            None
-        )
-
-    # Handle additional images if they exist
-    if hasattr(instance, 'images'):
-        for image in instance.images.all():
-            if image.image:
-                img = Image.open(image.image)
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                output = BytesIO()
-                img.save(output, format='JPEG', quality=80, optimize=True)
-                output.seek(0)
-                image.image = InMemoryUploadedFile(
-                    output,
-                    'ImageField',
-                    f"{image.image.name.split('.')[0]}.jpg",
-                    'image/jpeg',
-                    sys.getsizeof(output),
-                    None
-                )
-                image.save() 
\ No newline at end of file
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Stuff)
+def store_image_by_content(sender, instance, raw=False, **kwargs):
+    # Identical uploads end up as one file on disk
+    if not raw:
+        dedupe_upload(instance)
+
+
+@receiver(post_save, sender=ProductImage)
+def queue_product_image(sender, instance, created, raw=False, **kwargs):
+    # The original is stored as uploaded; renditions are generated by
+    # `manage.py process_images`, or right after commit when
+    # IMAGE_PROCESSING_ASYNC is off
+    if raw or not instance.image or instance.processed_at is not None:
+        return
+    if not settings.IMAGE_PROCESSING_ASYNC:
+        transaction.on_commit(lambda: process_image(instance))
+
+
+@receiver(post_migrate)
+def create_product_search_table(sender, app_config, **kwargs):
+    if app_config.label == 'api':
+        create_search_table()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and not INDEXED_FIELDS & set(update_fields)):
+        return
+    get_search_index().index(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_index().remove(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Category names are part of the indexed text of their products
+    if created or raw or (update_fields and 'name' not in update_fields):
+        return
+    index = get_search_index()
+    for product in instance.products.select_related('category'):
+        index.index(product)
+
+
+# Product cards: these receivers are connected before api.invalidation's,
+# so a card is rewritten before the catalog cache version is bumped
+
+@receiver(post_save, sender=Product)
+def refresh_product_card(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def delete_product_card(sender, instance, **kwargs):
+    ProductCard.objects.filter(id=instance.pk).delete()
+    schedule_export([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def export_categories(sender, raw=False, **kwargs):
+    if not raw:
+        schedule_export(categories=True)
+
+
+@receiver(m2m_changed, sender=Product.size.through)
+@receiver(m2m_changed, sender=Product.images.through)
+def refresh_product_card_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_refresh([instance.pk])
+    elif pk_set:
+        schedule_refresh(pk_set)
+
+
+@receiver(post_save, sender=ProductImage)
+def refresh_image_product_cards(sender, instance, created, raw=False, **kwargs):
+    # A new image is not linked to a product yet; m2m_changed covers that
+    if not created and not raw:
+        schedule_refresh(instance.product_images.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_product_cards(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        schedule_refresh(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Size)
+def refresh_size_product_cards(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        schedule_refresh(instance.product_sizes.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Size)
+def refresh_size_product_cards_before_delete(sender, instance, **kwargs):
+    # The through rows go without an m2m_changed signal, so collect the
+    # affected products while they are still linked. Product images are
+    # deleted through delete_product_images(), which does the same for a
+    # whole batch with one query.
+    schedule_refresh(instance.product_sizes.values_list('id', flat=True))
+
+
+@receiver(post_migrate)
+def build_product_cards(sender, app_config, **kwargs):
+    # Fill the table once for catalogs created before it existed
+    if app_config.label == 'api' and not ProductCard.objects.exists() and Product.objects.exists():
+        rebuild_product_cards()
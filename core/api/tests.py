@@ -1,3 +1,968 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from smtplib import SMTPRecipientsRefused
+from tempfile import TemporaryDirectory
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    Category, ContactUs, Order, OrderItem, OutgoingEmail, Product, ProductCard, ProductImage, Review, Size, Stuff,
+)
+from .pagination import KeysetPaginator
+from .serializers import ProductDetailSerializer, ProductImageSerializer
+from .services import image_pipeline, metrics
+from .services.catalog_cache import CatalogCache
+from .services.catalog_export import CatalogExporter, export_catalog
+from .services.email_service import EmailService
+from .services.image_pipeline import create_product_images, pending_images, process_images, process_pending
+from .services.image_renditions import available_formats
+from .services.media_store import walk_storage
+from .services.product_cards import delete_product_images, rebuild_product_cards
+from .services.response_cache import brotli, json_response, render_payload
+from .services.search_index import MemorySearchIndex, get_search_index
+from .services.shared_cache import get_or_set, lock_key
+
+
+class QueryBudgetMixin:
+    """
+    Seeds a realistic catalog once per test class and asserts upper bounds
+    on the number of SQL queries per request. The bounds do not depend on
+    how many rows are returned, so an N+1 regression fails the build.
+    """
+    PRODUCTS = 240
+    CATEGORIES = 8
+    SIZES = 6
+    IMAGES_PER_PRODUCT = 3
+    SIZES_PER_PRODUCT = 4
+    ORDERS = 30
+    ITEMS_PER_ORDER = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = Category.objects.bulk_create(
+            [Category(name=f'Category {i}', image=f'category_images/{i}.jpg') for i in range(cls.CATEGORIES)]
+        )
+        cls.sizes = Size.objects.bulk_create([Size(size=f'Size {i}') for i in range(cls.SIZES)])
+        cls.products = Product.objects.bulk_create([
+            Product(
+                title=f'Product {i}',
+                price=500 + i * 10,
+                description=f'Cotton three piece number {i}',
+                category=cls.categories[i % cls.CATEGORIES],
+            )
+            for i in range(cls.PRODUCTS)
+        ])
+
+        images = ProductImage.objects.bulk_create([
+            ProductImage(
+                image=f'product_images/{i}-{n}.jpg',
+                renditions={'detail': {'width': 800, 'height': 800, 'jpeg': f'product_images/renditions/{i}-{n}.jpg'}},
+                placeholder='data:image/jpeg;base64,AA==',
+                dominant_color='#aabbcc',
+            ) if n else ProductImage(image_url=f'https://cdn.example.com/{i}.jpg')
+            for i in range(cls.PRODUCTS) for n in range(cls.IMAGES_PER_PRODUCT)
+        ])
+        Product.images.through.objects.bulk_create([
+            Product.images.through(product_id=product.id, productimage_id=image.id)
+            for index, product in enumerate(cls.products)
+            for image in images[index * cls.IMAGES_PER_PRODUCT:(index + 1) * cls.IMAGES_PER_PRODUCT]
+        ])
+        Product.size.through.objects.bulk_create([
+            Product.size.through(product_id=product.id, size_id=cls.sizes[(index + n) % cls.SIZES].id)
+            for index, product in enumerate(cls.products)
+            for n in range(cls.SIZES_PER_PRODUCT)
+        ])
+
+        cls.orders = Order.objects.bulk_create([
+            Order(customer_name=f'Customer {i}', customer_phone='01700000000', customer_address='Dhaka')
+            for i in range(cls.ORDERS)
+        ])
+        items = OrderItem.objects.bulk_create([
+            OrderItem(product=cls.products[i * cls.ITEMS_PER_ORDER + n], size=cls.sizes[n], quantity=n + 1)
+            for i in range(cls.ORDERS) for n in range(cls.ITEMS_PER_ORDER)
+        ])
+        Order.items.through.objects.bulk_create([
+            Order.items.through(order_id=order.id, orderitem_id=item.id)
+            for index, order in enumerate(cls.orders)
+            for item in items[index * cls.ITEMS_PER_ORDER:(index + 1) * cls.ITEMS_PER_ORDER]
+        ])
+
+        Stuff.objects.bulk_create([
+            Stuff(name=f'Member {i}', position='Designer', s_id=str(i), image=f'stuff_images/{i}.jpg')
+            for i in range(10)
+        ])
+        Review.objects.bulk_create([
+            Review(name=f'Reviewer {i}', message='Lovely fabric', rating=5, approved=True) for i in range(50)
+        ])
+        ContactUs.objects.bulk_create([
+            ContactUs(name=f'Visitor {i}', email=f'visitor{i}@example.com', message='Hello') for i in range(20)
+        ])
+
+        # bulk_create sends no signals, so index the seeded catalog by hand
+        get_search_index().rebuild()
+        rebuild_product_cards()
+
+    def setUp(self):
+        cache.clear()
+
+    @contextmanager
+    def assertMaxQueries(self, maximum):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > maximum:
+            queries = '\n'.join(query['sql'] for query in context.captured_queries)
+            self.fail(f'{executed} queries executed, expected at most {maximum}:\n{queries}')
+
+    def get(self, path, maximum, **extra):
+        with self.assertMaxQueries(maximum):
+            response = self.client.get(path, **extra)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class PublicEndpointQueryTests(QueryBudgetMixin, TestCase):
+
+    def test_product_list(self):
+        self.get('/api/products/?page_size=100', 1)
+        # Cached pages are served without touching the database
+        self.get('/api/products/?page_size=100', 0)
+
+    def test_product_list_filtered_next_page(self):
+        category, size = self.categories[0], self.sizes[0]
+        response = self.get(f'/api/products/?category={category.id}&size={size.id}&ordering=price&page_size=5', 1)
+        cursor = response.json()['next_cursor']
+        self.get(f'/api/products/?category={category.id}&size={size.id}&ordering=price&page_size=5&cursor={cursor}', 1)
+
+    def test_product_search(self):
+        self.get('/api/products/search/?q=product&page_size=50', 5)
+        self.get('/api/products/search/?q=product&page_size=50', 0)
+
+    def test_product_batch(self):
+        ids = ','.join(str(product.id) for product in self.products[:50])
+        self.get(f'/api/products/batch/?ids={ids}', 1)
+        self.get(f'/api/products/batch/?ids={ids}', 0)
+
+    def test_product_detail(self):
+        self.get(f'/api/products/{self.products[0].id}/', 1)
+        self.get(f'/api/products/{self.products[0].id}/', 0)
+
+    def test_featured_products(self):
+        self.get('/api/featured-products/', 1)
+        self.get('/api/featured-products/', 0)
+
+    def test_categories(self):
+        self.get('/api/categories/', 1)
+        self.get('/api/categories/', 0)
+
+    def test_sizes(self):
+        self.get('/api/sizes/', 1)
+
+    def test_team(self):
+        self.get('/api/team/', 1)
+        self.get('/api/stuff/', 1)
+
+    def test_reviews(self):
+        self.get('/api/reviews/', 1)
+
+    def test_contact_us(self):
+        with self.assertMaxQueries(2):
+            response = self.client.post('/api/contact-us/', {
+                'name': 'Visitor', 'email': 'visitor@example.com', 'message': 'Hello'
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_order_with_many_items(self):
+        items = [
+            {'product_id': str(product.id), 'size_id': str(self.sizes[0].id), 'quantity': 2}
+            for product in self.products[:40]
+        ]
+        with self.assertMaxQueries(12):
+            response = self.client.post('/api/order/', {
+                'customer_name': 'Customer', 'customer_phone': '01700000000',
+                'customer_address': 'Dhaka', 'items_data': items,
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content[:500])
+
+    def test_order_rejects_non_positive_quantities(self):
+        for quantity in (0, -3):
+            with self.subTest(quantity=quantity):
+                response = self.client.post('/api/order/', {
+                    'customer_name': 'Customer', 'customer_phone': '01700000000', 'customer_address': 'Dhaka',
+                    'items_data': [{'product_id': str(self.products[0].id), 'quantity': quantity}],
+                }, content_type='application/json')
+                self.assertEqual(response.status_code, 400, response.content[:500])
+        self.assertEqual(Order.objects.count(), self.ORDERS)
+
+
+class ResponseEncodingTests(TestCase):
+    PAYLOAD = {'products': [{'title': f'Product {i}', 'description': 'Cotton three piece'} for i in range(50)]}
+
+    def respond(self, accept_encoding, payload=PAYLOAD):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return json_response(request, render_payload(payload))
+
+    def test_negotiates_encoding(self):
+        identity = render_payload(self.PAYLOAD)['identity']
+        cases = {
+            '': None,
+            'gzip': 'gzip',
+            'deflate, gzip;q=0.5': 'gzip',
+            'gzip;q=0': None,
+            'GZIP': 'gzip',
+            'deflate': None,
+            '*': 'br' if brotli else 'gzip',
+            'br, gzip': 'br' if brotli else 'gzip',
+        }
+        for accept_encoding, expected in cases.items():
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.respond(accept_encoding)
+                self.assertEqual(response.get('Content-Encoding'), expected)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                body = response.content
+                if expected == 'gzip':
+                    body = gzip.decompress(body)
+                elif expected == 'br':
+                    body = brotli.decompress(body)
+                self.assertEqual(body, identity)
+
+    def test_small_bodies_are_not_compressed(self):
+        payload = {'status': 'success'}
+        self.assertEqual(set(render_payload(payload)), {'identity'})
+        response = self.respond('gzip, br', payload)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('Vary', response)
+        self.assertEqual(json.loads(response.content), payload)
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class ConditionalRequestTests(QueryBudgetMixin, TestCase):
+    PRODUCTS = 30
+    ORDERS = 4
+
+    def test_matching_validators_get_304(self):
+        response = self.get('/api/products/', 10)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_write_changes_the_etag(self):
+        etag = self.get('/api/products/', 10)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(id=self.products[0].id).save()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_per_query_host_and_encoding(self):
+        etags = {
+            self.get('/api/products/', 10)['ETag'],
+            self.get(f'/api/products/?category={self.categories[0].id}', 10)['ETag'],
+            self.get('/api/products/', 10, HTTP_HOST='shop.example.com')['ETag'],
+        }
+        self.assertEqual(len(etags), 3)
+
+        gzipped = self.get('/api/products/', 10, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertTrue(gzipped['ETag'].endswith('-gzip"'))
+        self.assertNotIn(gzipped['ETag'], etags)
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_wildcard_only_matches_existing_resources(self):
+        path = f'/api/products/{self.products[0].id}/'
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH='*').status_code, 304)
+        response = self.client.get('/api/products/00000000-0000-0000-0000-000000000000/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True, SERVER_TIMING_HEADER=True)
+class RequestMetricsTests(QueryBudgetMixin, TestCase):
+    PRODUCTS = 30
+    ORDERS = 4
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_server_timing_and_metrics(self):
+        miss = self.get('/api/products/', 10)['Server-Timing']
+        self.assertRegex(miss, r'^db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('cache;desc="miss (0 hit, 1 miss)"', miss)
+        self.assertRegex(miss, r'serialize;dur=[\d.]+')
+        self.assertRegex(miss, r'total;dur=[\d.]+$')
+
+        hit = self.get('/api/products/', 0)['Server-Timing']
+        self.assertIn('db;dur=0.0;desc="0 queries"', hit)
+        self.assertIn('cache;desc="hit (1 hit, 0 miss)"', hit)
+        self.assertNotIn('serialize', hit)
+
+        labels = 'endpoint="api/products/",method="GET"'
+        output = metrics.registry.render()
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 2', output)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', output)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', output)
+        self.assertIn(f'http_request_serialize_duration_seconds_count{{{labels}}} 1', output)
+        self.assertIn(f'http_request_cache_lookups_total{{{labels},result="hit"}} 1', output)
+        self.assertIn(f'http_request_cache_lookups_total{{{labels},result="miss"}} 1', output)
+
+
+class GenerateFakeDataTests(TestCase):
+
+    def test_seeds_catalog_with_bulk_inserts(self):
+        with CaptureQueriesContext(connection) as context:
+            call_command(
+                'generate_fake_data', products=120, images_per_product=2, orders=10,
+                batch_size=50, seed=1, stdout=StringIO()
+            )
+        self.assertEqual(Product.objects.count(), 120)
+        self.assertEqual(Product.images.through.objects.count(), 240)
+        self.assertEqual(Order.items.through.objects.count(), 30)
+        # Inserts are batched, not one per row
+        self.assertLess(len(context.captured_queries), 60)
+        # Seeded products are searchable straight away
+        response = self.client.get('/api/products/search/?q=' + Product.objects.first().title.split()[0])
+        self.assertGreater(response.json()['count'], 0)
+
+
+class ProductCardTests(QueryBudgetMixin, TestCase):
+    PRODUCTS = 16
+    ORDERS = 4
+
+    def test_cards_match_serializer_output(self):
+        request = RequestFactory().get('/')
+        product = Product.objects.order_by('-created_at', '-id').first()
+        expected = ProductDetailSerializer(product, context={'request': request}).data
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.json()['product'], json.loads(json.dumps(expected, cls=DjangoJSONEncoder)))
+        listed = self.client.get('/api/products/').json()['products'][0]
+        self.assertTrue(any(
+            (image['image'] or '').startswith('http://testserver/media/') for image in listed['images']
+        ))
+
+    def test_writes_refresh_cards(self):
+        product = self.products[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(id=product.id).save()
+            product.size.remove(self.sizes[0])
+        card = ProductCard.objects.get(id=product.id)
+        self.assertNotIn(str(self.sizes[0].id), [size['id'] for size in card.card['size']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.filter(id=product.category_id).update(name='Renamed')
+            Category.objects.get(id=product.category_id).save()
+        self.assertEqual(ProductCard.objects.get(id=product.id).detail['category']['name'], 'Renamed')
+
+        image = product.images.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_product_images(ProductImage.objects.filter(id=image.id))
+        card = ProductCard.objects.get(id=product.id)
+        self.assertNotIn(str(image.id), [row['id'] for row in card.card['images']])
+
+        Product.objects.filter(id=product.id).delete()
+        self.assertFalse(ProductCard.objects.filter(id=product.id).exists())
+
+    def test_missing_card_is_built_on_read(self):
+        product = self.products[1]
+        ProductCard.objects.filter(id=product.id).delete()
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.json()['product']['title'], product.title)
+        self.assertTrue(ProductCard.objects.filter(id=product.id).exists())
+
+
+class CatalogExportTests(QueryBudgetMixin, TestCase):
+    PRODUCTS = 150
+    ORDERS = 4
+
+    def setUp(self):
+        super().setUp()
+        self.root = Path(self.enterContext(TemporaryDirectory()))
+        self.enterContext(override_settings(
+            CATALOG_SNAPSHOT_ROOT=self.root, CATALOG_SNAPSHOT_BASE_URL='https://shop.example.com'
+        ))
+
+    def read(self, name):
+        return json.loads((self.root / name).read_text())
+
+    def test_full_export_is_incremental(self):
+        written, removed = export_catalog()
+        self.assertEqual(written, self.PRODUCTS + 4)  # details, 2 pages, categories, featured
+        page = self.read('products/page-1.json')
+        self.assertEqual(page['next'], 'page-2.json')
+        listed = self.client.get('/api/products/?page_size=100').json()['products']
+        self.assertEqual([product['id'] for product in page['products']], [product['id'] for product in listed])
+        self.assertEqual(len(self.read('products/page-2.json')['products']), 50)
+        self.assertTrue((self.root / 'products/page-1.json.gz').exists())
+        detail = self.read(f'products/{self.products[0].id}.json')['product']
+        self.assertTrue(any((image['image'] or '').startswith('https://shop.example.com/media/')
+                            for image in detail['images']))
+        self.assertEqual(self.read('manifest.json')['version'], 1)
+
+        # Nothing changed, nothing rewritten
+        self.assertEqual(export_catalog(), (0, 0))
+        self.assertEqual(self.read('manifest.json')['version'], 1)
+
+    @override_settings(CATALOG_SNAPSHOTS=True)
+    def test_writes_rewrite_affected_files(self):
+        export_catalog()
+        oldest = Product.objects.order_by('created_at', 'id').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(id=oldest.id).update(title='Renamed')
+            Product.objects.get(id=oldest.id).save(update_fields=['title'])
+        self.assertEqual(self.read(f'products/{oldest.id}.json')['product']['title'], 'Renamed')
+        self.assertIn('Renamed', [product['title'] for product in self.read('products/page-2.json')['products']])
+        self.assertEqual(self.read('manifest.json')['version'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(id=oldest.id).delete()
+        self.assertFalse((self.root / f'products/{oldest.id}.json').exists())
+        self.assertEqual(len(self.read('products/page-2.json')['products']), 49)
+
+    def test_exporters_take_turns(self):
+        entered = threading.Event()
+
+        def export_second():
+            with CatalogExporter() as exporter:
+                entered.set()
+                exporter.write('second.json', {'n': 2})
+
+        with CatalogExporter() as exporter:
+            exporter.write('first.json', {'n': 1})
+            thread = threading.Thread(target=export_second)
+            thread.start()
+            # Blocked on the lock until the first exporter saved its manifest
+            self.assertFalse(entered.wait(0.2))
+        thread.join(5)
+
+        manifest = self.read('manifest.json')
+        self.assertEqual(manifest['version'], 2)
+        self.assertEqual(set(manifest['files']), {'first.json', 'second.json'})
+        self.assertEqual((self.root / 'second.json').stat().st_mode & 0o777, 0o644)
+        self.assertEqual(list(self.root.glob('.*.tmp')), [])
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class SharedCacheTests(QueryBudgetMixin, TestCase):
+    """
+    Workers are simulated with separate cache connections (and threads),
+    which is all a gunicorn worker process shares with its siblings.
+    """
+    PRODUCTS = 30
+    ORDERS = 4
+
+    def cache_settings(self):
+        location = self.enterContext(TemporaryDirectory())
+        return {'BACKEND': 'api.cache_backends.FileBasedCache', 'LOCATION': location}
+
+    def setUp(self):
+        self.enterContext(override_settings(CACHES={'default': {**self.cache_settings(), 'KEY_PREFIX': 'test'}}))
+        super().setUp()
+
+    @contextmanager
+    def worker(self):
+        previous = caches['default']
+        caches['default'] = caches.create_connection('default')
+        try:
+            yield
+        finally:
+            caches['default'] = previous
+
+    def test_invalidation_reaches_every_worker(self):
+        with self.worker():
+            self.get('/api/products/', 1)
+            self.get('/api/products/', 0)
+        with self.worker():
+            product = Product.objects.order_by('-created_at', '-id').first()
+            product.title = 'Renamed'
+            with self.captureOnCommitCallbacks(execute=True):
+                product.save()
+        with self.worker():
+            response = self.get('/api/products/', 1)
+            self.assertEqual(response.json()['products'][0]['title'], 'Renamed')
+
+    def test_bumped_versions_outlive_the_default_timeout(self):
+        self.enterContext(override_settings(CACHES={'default': {**self.cache_settings(), 'TIMEOUT': 1}}))
+        version = CatalogCache.versions([CatalogCache.PRODUCTS])[CatalogCache.PRODUCTS]
+        CatalogCache.bump(CatalogCache.PRODUCTS)
+        time.sleep(1.5)
+        self.assertEqual(CatalogCache.versions([CatalogCache.PRODUCTS])[CatalogCache.PRODUCTS], version + 1)
+
+    def test_key_prefix_separates_sites(self):
+        with self.worker():
+            cache.set('greeting', 'hello')
+        with override_settings(CACHES={'default': {**settings.CACHES['default'], 'KEY_PREFIX': 'other'}}):
+            self.assertIsNone(cache.get('greeting'))
+        with self.worker():
+            self.assertEqual(cache.get('greeting'), 'hello')
+
+    def test_concurrent_misses_build_once(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            return {'products': []}
+
+        def request(_):
+            # Every thread gets its own cache connection
+            try:
+                return get_or_set('catalog:slow', build)
+            finally:
+                caches.close_all()
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(request, range(6)))
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, [{'products': []}] * 6)
+
+    def test_add_is_atomic(self):
+        barrier = threading.Barrier(8)
+
+        def add(_):
+            barrier.wait()
+            try:
+                return cache.add('catalog:lock', 1, 60)
+            finally:
+                caches.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(sum(executor.map(add, range(8))), 1)
+        # Expired entries don't block a new add
+        cache.set('catalog:expired', 1, 0.01)
+        time.sleep(0.05)
+        self.assertTrue(cache.add('catalog:expired', 2, 60))
+        self.assertEqual(cache.get('catalog:expired'), 2)
+
+    @override_settings(CACHE_LOCK_TIMEOUT=0)
+    def test_abandoned_lock_does_not_block(self):
+        cache.add(lock_key('catalog:abandoned'), 1, 60)
+        self.assertEqual(get_or_set('catalog:abandoned', lambda: 'built'), 'built')
+
+    def expire(self, key, value='old'):
+        cache.set(key, (value, time.time() - 1), 60)
+
+    def test_stale_entry_is_rebuilt_by_one_request(self):
+        self.expire('catalog:stale')
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            return 'new'
+
+        def request(_):
+            try:
+                return get_or_set('catalog:stale', build, stale_timeout=60)
+            finally:
+                caches.close_all()
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(request, range(6)))
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(sorted(results), ['new'] + ['old'] * 5)
+        self.assertEqual(get_or_set('catalog:stale', build), 'new')
+
+    @override_settings(CACHE_REFRESH_IN_BACKGROUND=True)
+    def test_stale_entry_is_rebuilt_in_background(self):
+        self.expire('catalog:background')
+        self.assertEqual(get_or_set('catalog:background', lambda: 'new', stale_timeout=60), 'old')
+        for _ in range(40):
+            if cache.get('catalog:background')[0] == 'new':
+                break
+            time.sleep(0.05)
+        self.assertEqual(cache.get('catalog:background')[0], 'new')
+        self.assertIsNone(cache.get(lock_key('catalog:background')))
+
+    def test_failed_rebuild_serves_stale(self):
+        self.expire('catalog:broken')
+
+        def build():
+            raise RuntimeError('database unavailable')
+
+        with self.assertLogs('api.services.shared_cache', 'ERROR'):
+            self.assertEqual(get_or_set('catalog:broken', build, stale_timeout=60), 'old')
+        self.assertIsNone(cache.get(lock_key('catalog:broken')))
+
+    @override_settings(CACHE_TTL_JITTER=0.5)
+    def test_lifetimes_are_jittered(self):
+        now = time.time()
+        for index in range(20):
+            get_or_set(f'catalog:jitter:{index}', lambda: 'value', timeout=100)
+        expiries = [cache.get(f'catalog:jitter:{index}')[1] - now for index in range(20)]
+        self.assertGreater(len({round(expiry) for expiry in expiries}), 1)
+        self.assertTrue(all(49 <= expiry <= 151 for expiry in expiries))
+
+    def test_catalog_pages_are_served_stale(self):
+        self.get('/api/featured-products/', 1)
+        key = CatalogCache.make_key('featured_product_list')
+        encodings, _ = cache.get(key)
+        cache.set(key, (encodings, time.time() - 1), 60)
+        cache.add(lock_key(key), 1, 60)  # another worker is already rebuilding it
+        response = self.get('/api/featured-products/', 0)
+        self.assertEqual(response.content, encodings['identity'])
+
+@skipUnless(os.getenv('REDIS_URL'), 'REDIS_URL is not set')
+class RedisSharedCacheTests(SharedCacheTests):
+
+    def cache_settings(self):
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.getenv('REDIS_URL')}
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class WarmCacheTests(QueryBudgetMixin, TestCase):
+    PRODUCTS = 60
+    ORDERS = 4
+
+    def test_warmed_entries_need_no_queries(self):
+        out = StringIO()
+        call_command('warm_cache', host='shop.example.com', secure=True, pages=2, workers=1, stdout=out)
+        self.assertIn('Cache warmed', out.getvalue())
+
+        self.get('/api/categories/', 0)
+        self.get('/api/featured-products/', 0)
+        response = self.get('/api/products/', 0)
+        self.get(f"/api/products/?cursor={response.json()['next_cursor']}", 0)
+        self.get(f'/api/products/?category={self.categories[0].id}', 0)
+        ids = ','.join(str(product.id) for product in self.products)
+        response = self.get(f'/api/products/batch/?ids={ids}', 0)
+        images = [image['image'] for product in response.json()['products'] for image in product['images']]
+        self.assertTrue(any((image or '').startswith('https://shop.example.com/media/') for image in images))
+
+
+class ProductSearchTests(TestCase):
+
+    def test_rebuilt_after_writes_from_other_processes(self):
+        product = Product.objects.create(title='Linen kurta', description='')
+        index = MemorySearchIndex()
+        self.assertEqual(index.search('kurta', 10), ([str(product.id)], 1))
+
+        # Writes that don't touch indexed text keep the index
+        CatalogCache.bump(CatalogCache.PRODUCTS, CatalogCache.CATEGORIES)
+        with mock.patch.object(index, 'rebuild') as rebuild:
+            index.search('kurta', 10)
+        rebuild.assert_not_called()
+
+        # Another worker's write reaches this process as a version bump only
+        Product.objects.filter(id=product.id).update(title='Silk saree')
+        product.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            MemorySearchIndex().index(product)
+        self.assertEqual(index.search('saree', 10), ([str(product.id)], 1))
+        self.assertEqual(index.search('kurta', 10), ([], 0))
+
+    def test_pages_past_the_end_return_the_last_page(self):
+        Product.objects.bulk_create([Product(title=f'Linen kurta {i}', description='') for i in range(5)])
+        get_search_index().rebuild()
+        for page in (3, 99999999999999999999):
+            with self.subTest(page=page):
+                response = self.client.get(f'/api/products/search/?q=kurta&page={page}&page_size=2')
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual((data['page'], len(data['products']), data['has_more']), (3, 1, False))
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class ImagePipelineTests(TestCase):
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())))
+
+    def upload(self, content, name='upload.png', **fields):
+        image = ProductImage(**fields)
+        image.image.save(name, ContentFile(content), save=False)
+        image.save()
+        return image
+
+    def tearDown(self):
+        if image_pipeline._executor is not None:
+            image_pipeline._executor.shutdown()
+            image_pipeline._executor = None
+
+    def png(self, width, height, color=(200, 30, 60, 255)):
+        output = BytesIO()
+        Image.new('RGBA', (width, height), color).save(output, format='PNG')
+        return output.getvalue()
+
+    def test_renders_renditions(self):
+        image = self.upload(self.png(1200, 600))
+        self.assertEqual(process_images([image]), (1, 0))
+
+        image.refresh_from_db()
+        self.assertEqual(image.processing_error, '')
+        self.assertIsNotNone(image.processed_at)
+        self.assertTrue(image.placeholder.startswith('data:image/jpeg;base64,'))
+        self.assertEqual(image.dominant_color, '#c81e3c')
+        formats = {fmt.lower(): fmt for fmt in available_formats()}
+        for name, size in settings.IMAGE_RENDITIONS.items():
+            rendition = image.renditions[name]
+            self.assertEqual((rendition['width'], rendition['height']), (size, size // 2))
+            self.assertEqual(set(rendition) - {'width', 'height'}, set(formats))
+            for key, fmt in formats.items():
+                with default_storage.open(rendition[key]) as f, Image.open(f) as rendered:
+                    self.assertEqual((rendered.format, rendered.size), (fmt, (size, size // 2)))
+
+        data = ProductImageSerializer(image, context={'request': RequestFactory().get('/')}).data
+        self.assertEqual(data['image'], f"http://testserver{default_storage.url(image.renditions['detail']['jpeg'])}")
+        self.assertEqual(set(data['srcset']), set(settings.IMAGE_RENDITIONS))
+        self.assertEqual(data['srcset']['card']['width'], 480)
+        self.assertTrue(data['srcset']['card']['jpeg'].startswith('http://testserver/media/'))
+
+    def test_undecodable_upload_fails(self):
+        image = self.upload(b'not an image', name='broken.png')
+        self.assertEqual(process_images([image]), (0, 1))
+        image.refresh_from_db()
+        self.assertEqual(image.renditions, {})
+        self.assertTrue(image.processing_error)
+        self.assertIsNotNone(image.processed_at)
+        self.assertEqual(ProductImageSerializer(image).data['image'], image.image.url)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=2)
+    def test_batch_is_rendered_in_a_process_pool(self):
+        images = [self.upload(self.png(400 + 100 * i, 400), name=f'{i}.png') for i in range(3)]
+        images.append(self.upload(b'not an image', name='broken.png'))
+        self.assertEqual(process_images(images), (3, 1))
+        self.assertIsNotNone(image_pipeline._executor)
+        for i, image in enumerate(images[:3]):
+            image.refresh_from_db()
+            # Results are matched back to the right image
+            self.assertEqual(image.renditions['card']['width'], 480 if i else 400)
+            self.assertEqual(image.renditions['detail']['width'], 400 + 100 * i)
+
+    def test_failed_backfill_is_not_retried(self):
+        # Rendered before placeholders existed, original no longer decodes
+        image = self.upload(
+            b'not an image', processed_at=timezone.now(),
+            renditions={'detail': {'width': 1, 'height': 1, 'jpeg': 'detail.jpg'}},
+        )
+        self.assertEqual(list(pending_images()), [image])
+        self.assertEqual(process_pending(), (0, 1))
+        image.refresh_from_db()
+        self.assertTrue(image.processing_error)
+        self.assertEqual(list(pending_images()), [])
+
+        out = StringIO()
+        call_command('process_images', stdout=out)
+        self.assertIn('Processed 0 images, 0 failed', out.getvalue())
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=True)
+class MediaDedupeTests(TestCase):
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())))
+        self.products = [Product.objects.create(title=f'Kurta {i}', description='') for i in range(2)]
+
+    def files(self):
+        return list(walk_storage(default_storage, 'product_images'))
+
+    def test_repeated_upload_reuses_row_and_file(self):
+        first = create_product_images(self.products[0], [
+            {'image': SimpleUploadedFile('front.jpg', b'same bytes')},
+            {'image': SimpleUploadedFile('copy.jpg', b'same bytes')},
+        ])
+        second = create_product_images(self.products[1], [{'image': SimpleUploadedFile('other.jpg', b'same bytes')}])
+        self.assertEqual(len(first), 1)
+        self.assertEqual(first[0].id, second[0].id)
+        self.assertEqual(ProductImage.objects.count(), 1)
+        self.assertEqual(self.files(), [first[0].image.name])
+        for product in self.products:
+            self.assertEqual(list(product.images.all()), first)
+
+    def legacy_duplicates(self):
+        # Uploaded before content addressing: same bytes under two names, no hash
+        images = ProductImage.objects.bulk_create([
+            ProductImage(image=default_storage.save(f'product_images/legacy-{i}.jpg', ContentFile(b'same bytes')))
+            for i in range(2)
+        ])
+        for product, image in zip(self.products, images):
+            product.images.add(image)
+        return images
+
+    def test_merges_duplicates(self):
+        self.legacy_duplicates()
+        call_command('dedupe_media', stdout=StringIO())
+        image = ProductImage.objects.get()
+        self.assertTrue(image.content_hash)
+        self.assertEqual(self.files(), [image.image.name])
+        for product in self.products:
+            self.assertEqual(list(product.images.all()), [image])
+
+    def test_dry_run_and_keep_files_leave_storage_alone(self):
+        images = self.legacy_duplicates()
+        files = self.files()
+
+        out = StringIO()
+        call_command('dedupe_media', dry_run=True, stdout=out)
+        self.assertIn('ProductImage: 2 files content addressed', out.getvalue())
+        self.assertEqual(self.files(), files)
+        self.assertEqual(set(ProductImage.objects.values_list('content_hash', flat=True)), {''})
+
+        call_command('dedupe_media', keep_files=True, stdout=StringIO())
+        self.assertEqual(ProductImage.objects.count(), 1)
+        # The old copies stay next to the content-addressed one
+        self.assertEqual(set(self.files()), set(files) | {ProductImage.objects.get().image.name})
+        self.assertEqual({image.image.name for image in images}, set(files))
+
+
+class CollectMediaTests(TestCase):
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(TemporaryDirectory())))
+        self.old = timezone.now() - timedelta(days=2)
+
+    def store(self, name, old=True):
+        name = default_storage.save(name, ContentFile(name.encode()))
+        if old:
+            os.utime(default_storage.path(name), (self.old.timestamp(), self.old.timestamp()))
+        return name
+
+    def test_collects_only_old_orphans(self):
+        product = Product.objects.create(title='Kurta', description='')
+        used, orphan, young = ProductImage.objects.bulk_create([
+            ProductImage(image=self.store('product_images/used.jpg'), created_at=self.old),
+            ProductImage(image=self.store('product_images/orphan.jpg'), created_at=self.old),
+            # Uploaded moments ago and not attached yet, reusing an old file
+            ProductImage(image=self.store('product_images/young.jpg')),
+        ])
+        product.images.add(used)
+        stray = self.store('product_images/stray.jpg')
+        in_flight = self.store('product_images/in-flight.jpg', old=False)
+
+        out = StringIO()
+        call_command('collect_media', stdout=out)
+        self.assertIn('Found 1 product images', out.getvalue())
+        self.assertEqual(ProductImage.objects.count(), 3)
+
+        call_command('collect_media', delete=True, stdout=out)
+        self.assertEqual(set(ProductImage.objects.all()), {used, young})
+        self.assertFalse(ProductImage.objects.filter(id=orphan.id).exists())
+        for name in (used.image.name, young.image.name, in_flight):
+            self.assertTrue(default_storage.exists(name), name)
+        for name in (orphan.image.name, stray):
+            self.assertFalse(default_storage.exists(name), name)
+
+
+class KeysetPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create([
+            Product(title=f'Product {i}', description='', price=None if i % 5 == 0 else i % 7)
+            for i in range(60)
+        ])
+
+    def walk(self, ordering, page_size):
+        paginator = KeysetPaginator(ordering)
+        rows, cursor = paginator.paginate(Product.objects.all(), None, page_size)
+        while cursor:
+            page, cursor = paginator.paginate(Product.objects.all(), cursor, page_size)
+            rows += page
+        return rows
+
+    def test_pages_cover_every_row_once_with_nulls_last(self):
+        for ordering in ('price', '-price'):
+            rows = self.walk(ordering, 7)
+            self.assertEqual(len({row.id for row in rows}), 60)
+            prices = [row.price for row in rows]
+            self.assertEqual(prices[:48], sorted(prices[:48], reverse=ordering.startswith('-')))
+            self.assertEqual(prices[48:], [None] * 12)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite query plans')
+    def test_deep_pages_use_an_index_range(self):
+        paginator = KeysetPaginator('-created_at')
+        product = Product.objects.order_by('created_at').first()
+        queryset = paginator.order(Product.objects.all()).filter(paginator.after(product.created_at, product.pk))
+        sql, params = queryset[:21].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('SEARCH', plan)
+        self.assertNotIn('SCAN', plan)
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('SMTP server unreachable')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('Sent without a connection')
+
+
+class RejectingEmailBackend(locmem.EmailBackend):
+    """Rejects messages to rejected@example.com"""
+
+    def send_messages(self, email_messages):
+        if any('rejected@example.com' in message.to for message in email_messages):
+            raise SMTPRecipientsRefused({'rejected@example.com': (550, b'No such user')})
+        return super().send_messages(email_messages)
+
+
+class EmailOutboxTests(TestCase):
+
+    def setUp(self):
+        EmailService.queue_mail('Hello', 'Body', ['customer@example.com'])
+        EmailService.queue_mail('Hello', 'Body', ['rejected@example.com'])
+
+    def make_due(self):
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+
+    @override_settings(EMAIL_BACKEND='api.tests.RejectingEmailBackend')
+    def test_failed_message_is_retried_with_backoff(self):
+        start = timezone.now()
+        self.assertEqual(EmailService.deliver_queued(max_attempts=2, retry_delay=60), (1, 1))
+        self.assertEqual(len(mail.outbox), 1)
+        sent = OutgoingEmail.objects.get(recipients=['customer@example.com'])
+        self.assertEqual((sent.status, sent.attempts), (OutgoingEmail.STATUS_SENT, 1))
+
+        email = OutgoingEmail.objects.get(recipients=['rejected@example.com'])
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.STATUS_PENDING, 1))
+        self.assertIn('No such user', email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, start + timedelta(seconds=120))
+        # Not due yet
+        self.assertEqual(EmailService.deliver_queued(max_attempts=2, retry_delay=60), (0, 0))
+
+        self.make_due()
+        self.assertEqual(EmailService.deliver_queued(max_attempts=2, retry_delay=60), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.STATUS_FAILED, 2))
+
+    @override_settings(EMAIL_BACKEND='api.tests.UnreachableEmailBackend')
+    def test_connection_failure_fails_the_batch(self):
+        start = timezone.now()
+        self.assertEqual(EmailService.deliver_queued(max_attempts=2, retry_delay=60), (0, 2))
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), (OutgoingEmail.STATUS_PENDING, 1))
+            self.assertEqual(email.last_error, 'SMTP server unreachable')
+            self.assertGreaterEqual(email.next_attempt_at, start + timedelta(seconds=120))
+
+        self.make_due()
+        self.assertEqual(EmailService.deliver_queued(max_attempts=2, retry_delay=60), (0, 2))
+        self.assertEqual(
+            set(OutgoingEmail.objects.values_list('status', 'attempts')), {(OutgoingEmail.STATUS_FAILED, 2)}
+        )
@@ -1,12 +1,14 @@
 from django.contrib import admin
 from django.urls import path
-from .views import ProductList, ProductDetail, ContactUsView, OrderView, CategoryList, SizeView, FeaturedProducts, StuffView, ReviewView
+from .views import ProductList, ProductDetail, ContactUsView, OrderView, CategoryList, SizeView, FeaturedProducts, StuffView, ReviewView, ProductSearch, ProductBatch
 
 
 
 
 urlpatterns = [
     path('products/', ProductList.as_view(), name='product-list'),
+    path('products/search/', ProductSearch.as_view(), name='product-search'),
+    path('products/batch/', ProductBatch.as_view(), name='product-batch'),
     path('products/<uuid:pk>/', ProductDetail.as_view(), name='product-detail'),
     path('sizes/', SizeView.as_view(), name='size-list'),
     path('contact-us/', ContactUsView.as_view(), name='contact-us'),
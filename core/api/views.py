@@ -1,16 +1,15 @@
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
 from rest_framework import status
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django.views.decorators.vary import vary_on_cookie
 from django.db.models import Prefetch
-from .models import Product, ProductImage, Size, Category, ContactUs, Order, OrderItem,Stuff,Review
+from .models import Product, ProductCard, ProductImage, Size, Category, ContactUs, Order, OrderItem,Stuff,Review
 from .serializers import (
     ProductSerializer, 
-    ProductDetailSerializer, 
+    ProductFilterSerializer,
     CategorySerializer,
     ContactUsSerializer, 
     OrderSerializer,
@@ -23,38 +22,41 @@ from .serializers import (
 )
 
 from .services.email_service import EmailService
-from django.db import connection
-from django.db import reset_queries
-import time
+from .services.catalog_cache import CatalogCache
+from .services.response_cache import cached_json_response
+from .services.shared_cache import get_or_set
+from .services.metrics import record_cache, timed
+from .services.product_cards import absolutize, refresh_product_cards
+from .decorators import catalog_conditional
+from .pagination import KeysetPaginator, InvalidCursor, get_page_size
+from .services.search_index import get_search_index, tokenize
 from django.core.cache import cache
+from django.conf import settings
+from uuid import UUID
 
 class CategoryList(APIView):
     """
     Get all categories with their subcategories
     """
     def get_cache_key(self):
-        return 'category_list_cache_key'
+        return CatalogCache.make_key('category_list_cache_key')
 
+    def get_payload(self, request):
+        categories = Category.objects.all()
+        serializer = CategorySerializer(categories, many=True, context={'request': request})
+        return {
+            'status': 'success',
+            'message': 'Categories fetched successfully',
+            'categories': serializer.data
+        }
+
+    @catalog_conditional('category_list_cache_key')
     def get(self, request):
         try:
-            cache_key = self.get_cache_key()
-            cached_data = cache.get(cache_key)
-            
-            if cached_data:
-                return Response(cached_data)
-            
-            categories = Category.objects.prefetch_related('products').all()
-            serializer = CategorySerializer(categories, many=True, context={'request': request})
-            response_data = {
-                'status': 'success',
-                'message': 'Categories fetched successfully',
-                'categories': serializer.data
-            }
-            
-            # Cache for 5 minutes
-            cache.set(cache_key, response_data, 300)
-            
-            return Response(response_data, status=status.HTTP_200_OK)
+            # Cache the rendered response for 5 minutes
+            return cached_json_response(
+                request, self.get_cache_key(), lambda: self.get_payload(request)
+            )
         except Exception as e:
             return Response({
                 'status': 'error',
@@ -62,26 +64,120 @@ class CategoryList(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class ProductList(APIView):
+    """
+    Get products newest first, one page at a time.
+
+    Query params:
+    - page_size: products per page (DEFAULT_PAGE_SIZE, capped at MAX_PAGE_SIZE)
+    - cursor: the next_cursor value returned with the previous page
+    - category: category id
+    - size: size id
+    - min_price / max_price: inclusive price range
+    - ordering: -created_at (default), created_at, price or -price
+    """
+    def get_payload(self, request, filters, cursor, page_size):
+        # One indexed scan of the denormalized card table, no joins
+        cards = ProductCard.objects.filter(
+            **filters.get_card_filters()
+        ).only('id', 'created_at', 'price', 'card')
+        paginator = KeysetPaginator(filters.validated_data['ordering'])
+        cards, next_cursor = paginator.paginate(cards, cursor, page_size)
+        return {
+            'status': 'success',
+            'message': 'Products fetched successfully',
+            'products': [absolutize(card.card, request.build_absolute_uri) for card in cards],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+        }
+
+    @catalog_conditional('product_list')
     def get(self, request):
+        filters = ProductFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response({
+                'status': 'error',
+                'message': 'Invalid filters provided',
+                'errors': filters.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            cache_key = 'product_list'
-            products_data = cache.get(cache_key)
-            if products_data is None:
-                products = Product.objects.select_related('category').prefetch_related(
-                    Prefetch('size', queryset=Size.objects.only('id', 'size')),
-                    Prefetch('images', queryset=ProductImage.objects.only('id', 'image', 'image_url'))
-                ).order_by('-created_at')
-                serializer = ProductSerializer(
-                    products,
-                    many=True,
-                    context={'request': request}
-                )
-                products_data = serializer.data
-                cache.set(cache_key, products_data, timeout=300)  # Cache serialized data for 5 minutes
+            cursor = request.query_params.get('cursor') or None
+            page_size = get_page_size(request)
+            cache_key = CatalogCache.make_key(
+                'product_list', page_size, cursor or 'first', *filters.get_cache_parts()
+            )
+            # Cache each rendered page for 5 minutes
+            return cached_json_response(
+                request, cache_key, lambda: self.get_payload(request, filters, cursor, page_size)
+            )
+        except InvalidCursor as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ProductSearch(APIView):
+    """
+    Full-text product search over title, description and category name.
+
+    Query params:
+    - q: search terms; the last term is matched as a prefix
+    - page: 1-based page number; pages past the end return the last page
+    - page_size: results per page (DEFAULT_PAGE_SIZE, capped at MAX_PAGE_SIZE)
+    """
+    def search(self, request, terms, page, page_size):
+        product_ids, count = get_search_index().search(
+            ' '.join(terms), limit=page_size, offset=(page - 1) * page_size
+        )
+        products = Product.objects.filter(id__in=product_ids).select_related('category').prefetch_related(
+            Prefetch('size', queryset=Size.objects.only('id', 'size')),
+            Prefetch('images', queryset=ProductImage.objects.only('id', 'image', 'image_url', 'renditions', 'placeholder', 'dominant_color'))
+        ).in_bulk()
+        # Keep the ranking order of the index
+        ranked = [products[pk] for pk in map(UUID, product_ids) if pk in products]
+        serializer = ProductSerializer(ranked, many=True, context={'request': request})
+        with timed('serialize'):
+            return {
+                'products': serializer.data,
+                'count': count,
+            }
+
+    def get(self, request):
+        terms = tokenize(request.query_params.get('q', ''))
+        if not terms:
+            return Response({
+                'status': 'error',
+                'message': 'Search query (q) is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page = max(1, int(request.query_params.get('page', 1)))
+        except ValueError:
+            page = 1
+        page_size = get_page_size(request)
+
+        try:
+            def fetch(page):
+                cache_key = CatalogCache.make_key('product_search', '+'.join(terms), page, page_size)
+                return get_or_set(cache_key, lambda: self.search(request, terms, page, page_size))
+
+            results = fetch(page)
+            last_page = max(1, -(-results['count'] // page_size))
+            if page > last_page:
+                page = last_page
+                results = fetch(page)
             return Response({
                 'status': 'success',
                 'message': 'Products fetched successfully',
-                'products': products_data
+                'products': results['products'],
+                'count': results['count'],
+                'page': page,
+                'has_more': page * page_size < results['count'],
             }, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({
@@ -92,27 +188,20 @@ class ProductList(APIView):
 # use cache to get first 10 products faster
 
 class FeaturedProducts(APIView):
+    def get_payload(self, request):
+        cards = ProductCard.objects.only('id', 'card').order_by('-created_at', '-id')[:8]
+        return {
+            'status': 'success',
+            'message': 'Products fetched successfully',
+            'products': [absolutize(card.card, request.build_absolute_uri) for card in cards]
+        }
+
+    @catalog_conditional('featured_product_list')
     def get(self, request):
         try:
-            cache_key = 'featured_product_list'
-            products_data = cache.get(cache_key)
-            if products_data is None:
-                products = Product.objects.select_related('category').prefetch_related(
-                    Prefetch('size', queryset=Size.objects.only('id', 'size')),
-                    Prefetch('images', queryset=ProductImage.objects.only('id', 'image', 'image_url'))
-                ).order_by('-created_at')[:10]
-                serializer = ProductSerializer(
-                    products,
-                    many=True,
-                    context={'request': request}
-                )
-                products_data = serializer.data
-                cache.set(cache_key, products_data, timeout=300)  # Cache serialized data for 5 minutes
-            return Response({
-                'status': 'success',
-                'message': 'Products fetched successfully',
-                'products': products_data[:8]
-            }, status=status.HTTP_200_OK)
+            cache_key = CatalogCache.make_key('featured_product_list')
+            # Cache the rendered response for 5 minutes
+            return cached_json_response(request, cache_key, lambda: self.get_payload(request))
         except Exception as e:
             return Response({
                 'status': 'error',
@@ -122,30 +211,50 @@ class FeaturedProducts(APIView):
    
     
 
+def get_product_details(request, ids):
+    """
+    Return {id: serialized product} for the given product ids.
+
+    Each product is cached as its plain serialized dict (no model instances
+    or prefetch caches are pickled), all ids are looked up with a single
+    get_many, and misses are read from the ProductCard table in one query.
+    """
+    ids = [str(pk) for pk in ids]
+    keys = dict(zip(ids, CatalogCache.make_keys('product_detail', [(pk,) for pk in ids])))
+    cached = cache.get_many(list(keys.values()))
+    details = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in ids if pk not in details]
+    record_cache(hits=len(details), misses=len(missing))
+    if missing:
+        cards = dict(ProductCard.objects.filter(id__in=missing).values_list('id', 'detail'))
+        # Products without a card (written by code that sent no signals)
+        # get one now
+        stale = [pk for pk in missing if UUID(pk) not in cards]
+        if stale and Product.objects.filter(id__in=stale).exists():
+            refresh_product_cards(stale)
+            cards.update(ProductCard.objects.filter(id__in=stale).values_list('id', 'detail'))
+        with timed('serialize'):
+            fresh = {str(pk): absolutize(detail, request.build_absolute_uri) for pk, detail in cards.items()}
+        cache.set_many({keys[pk]: data for pk, data in fresh.items()}, timeout=300)  # Cache for 5 minutes
+        details.update(fresh)
+    return details
+
+
 class ProductDetail(APIView):
     """
     Get product details by ID
     """
+    @catalog_conditional('product_detail')
     def get(self, request, pk):
         try:
-            cache_key = f'product_detail_{pk}'
-            product = cache.get(cache_key)
-            
+            product = get_product_details(request, [pk]).get(str(pk))
             if product is None:
-                product = get_object_or_404(
-                    Product.objects.select_related('category').prefetch_related(
-                        Prefetch('images', queryset=ProductImage.objects.all()),
-                        Prefetch('size', queryset=Size.objects.all())
-                    ),
-                    id=pk
-                )
-                cache.set(cache_key, product, timeout=300)  # Cache for 5 minutes
-            
-            serializer = ProductDetailSerializer(product, context={'request': request})
+                raise Product.DoesNotExist
             return Response({
                 'status': 'success',
                 'message': 'Product details fetched successfully',
-                'product': serializer.data
+                'product': product
             }, status=status.HTTP_200_OK)
         except Product.DoesNotExist:
             return Response({
@@ -157,9 +266,51 @@ class ProductDetail(APIView):
                 'status': 'error',
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ProductBatch(APIView):
+    """
+    Get details of several products at once.
+
+    Query params:
+    - ids: comma separated product ids (at most MAX_PAGE_SIZE)
+
+    Products are returned in the requested order; unknown ids are listed
+    under `missing`.
+    """
+    def get(self, request):
+        try:
+            ids = list(dict.fromkeys(
+                str(UUID(pk.strip())) for pk in request.query_params.get('ids', '').split(',') if pk.strip()
+            ))
+        except ValueError:
+            return Response({
+                'status': 'error',
+                'message': 'ids must be a comma separated list of product ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not ids or len(ids) > settings.MAX_PAGE_SIZE:
+            return Response({
+                'status': 'error',
+                'message': f'Provide between 1 and {settings.MAX_PAGE_SIZE} product ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            details = get_product_details(request, ids)
+            return Response({
+                'status': 'success',
+                'message': 'Products fetched successfully',
+                'products': [details[pk] for pk in ids if pk in details],
+                'missing': [pk for pk in ids if pk not in details],
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
 
 class SizeView(APIView):
+    @catalog_conditional('size_list')
     def get(self, request):
         sizes = Size.objects.all()
         serializer = SizeSerializer(sizes, many=True)
@@ -178,8 +329,8 @@ class ContactUsView(APIView):
         if serializer.is_valid():
             contact = serializer.save()
             
-            # Send email using the service
-            email_sent = EmailService.send_contact_email(contact)
+            # Queue the notification; send_queued_emails delivers it
+            email_sent = EmailService.queue_contact_email(contact)
             
             response_data = {
                 'status': 'success',
@@ -231,12 +382,14 @@ class OrderView(APIView):
         if serializer.is_valid():
             # Save the inquiry
             order = serializer.save()
+            # Reload with the items prefetched for the receipt and response
+            order = OrderSerializer.setup_eager_loading(Order.objects).get(pk=order.pk)
             
             # Get customer email from request data
             customer_email = request.data.get('email')
             
-            # Send receipt email to both admin and customer
-            email_sent = EmailService.send_order_receipt(order, customer_email)
+            # Queue receipt emails to both admin and customer
+            email_sent = EmailService.queue_order_receipt(order, customer_email)
             
             response_data = OrderSerializer(order).data
             
@@ -259,6 +412,7 @@ class OrderView(APIView):
 
 class StuffView(APIView):
 
+    @catalog_conditional('team_list')
     def get(self, request):
         stuff = Stuff.objects.all()
         serializer = StuffSerializers(stuff, many=True, context={'request': request})
@@ -270,6 +424,7 @@ class StuffView(APIView):
     
 
 class ReviewView(APIView):
+    @catalog_conditional('review_list')
     def get(self, request):
         """Get all approved reviews for public display"""
         reviews = Review.objects.filter(approved=True)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -52,6 +54,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.CatalogExportMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -169,7 +173,10 @@ DEFAULT_PAGE_SIZE = 20
 MAX_PAGE_SIZE = 100
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Use django.core.mail.backends.console.EmailBackend or
+# django.core.mail.backends.filebased.EmailBackend locally
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -183,6 +190,64 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 
 
 
+# Cache shared by every worker process. The catalog cache, its invalidation
+# versions and the API rate limits all live here, so a per-process backend
+# would serve stale pages from the workers that missed an invalidation.
+# CACHE_BACKEND: 'file' (one directory shared by the workers of a host),
+# 'redis' (REDIS_URL, shared by every host) or 'locmem' (single process only)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file')
+CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'khadijah')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'TIMEOUT': 300,
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'api.cache_backends.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', Path(tempfile.gettempdir()) / 'khadijah-cache'),
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'TIMEOUT': 300,
+            # One file per entry; the default of 300 would cull product details
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '50000'))},
+        }
+    }
+elif CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"CACHE_BACKEND must be 'file', 'redis' or 'locmem', not {CACHE_BACKEND!r}")
+
+# Tests get a private LocMem cache instead of the shared one above
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# How long a cache miss may be rebuilt by one request while the others
+# wait for its result (see api.services.shared_cache.get_or_set)
+CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', '10'))
+
+# Cache lifetimes are spread by this fraction so entries built together
+# don't expire together
+CACHE_TTL_JITTER = float(os.getenv('CACHE_TTL_JITTER', '0.1'))
+
+# Seconds an expired catalog page (product list, featured products,
+# categories) is still served while one request rebuilds it; with
+# CACHE_REFRESH_IN_BACKGROUND that request serves the stale page too and
+# the rebuild runs in a thread
+CACHE_STALE_TIMEOUT = int(os.getenv('CACHE_STALE_TIMEOUT', '600'))
+CACHE_REFRESH_IN_BACKGROUND = os.getenv('CACHE_REFRESH_IN_BACKGROUND', 'false').lower() == 'true'
+
+
 # Add REST Framework settings
 
 REST_FRAMEWORK = {
@@ -225,3 +290,40 @@ IMAGE_OPTIMIZATION = {
     'FORMAT': 'JPEG'
 }
 
+# Responsive renditions generated for every uploaded product image
+# (name -> max width/height in px)
+IMAGE_RENDITIONS = {
+    'thumbnail': 160,
+    'card': 480,
+    'detail': IMAGE_OPTIMIZATION['MAX_WIDTH'],
+}
+
+# When true, renditions are generated by `manage.py process_images`;
+# otherwise right after the upload is committed
+IMAGE_PROCESSING_ASYNC = os.getenv('IMAGE_PROCESSING_ASYNC', 'true').lower() == 'true'
+
+# Processes used to render a batch of images in parallel (0 = one per CPU)
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', '0'))
+
+# Per-request db / cache / serializer timings in a Server-Timing header.
+# Aggregated metrics are served to admins at /api/admin/metrics/
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+
+# Static JSON snapshots of the public catalog (`manage.py export_catalog`).
+# With CATALOG_SNAPSHOTS on, the affected files are rewritten after every
+# catalog write, so a proxy can serve them without reaching Django
+CATALOG_SNAPSHOTS = os.getenv('CATALOG_SNAPSHOTS', 'false').lower() == 'true'
+CATALOG_SNAPSHOT_ROOT = Path(os.getenv('CATALOG_SNAPSHOT_ROOT', STATIC_ROOT / 'catalog'))
+# Prefix for media URLs inside the snapshots, e.g. https://shop.example.com
+CATALOG_SNAPSHOT_BASE_URL = os.getenv('CATALOG_SNAPSHOT_BASE_URL', '')
+
+# Catalog cache warm-up (`manage.py warm_cache`). Cached pages embed
+# absolute media URLs, so entries are built for the public host name.
+CACHE_WARM_HOST = os.getenv('CACHE_WARM_HOST', 'localhost')
+CACHE_WARM_SECURE = os.getenv('CACHE_WARM_SECURE', 'false').lower() == 'true'
+# Product list pages built by following next_cursor
+CACHE_WARM_PAGES = int(os.getenv('CACHE_WARM_PAGES', '5'))
+CACHE_WARM_WORKERS = int(os.getenv('CACHE_WARM_WORKERS', '4'))
+# Warm the cache from a background thread when the app starts. Set it in
+# the web server's environment only, not for management commands.
+CACHE_WARM_ON_STARTUP = os.getenv('CACHE_WARM_ON_STARTUP', 'false').lower() == 'true'
@@ -3,12 +3,19 @@ import { Link } from 'react-router-dom';
 import { Eye } from 'lucide-react';
 import { useCart, CartProduct } from '../../context/CartContext';
 import toast from 'react-hot-toast';
+import { Renditions, buildSrcSet } from '../../utils/images';
+
+// Rendered width of a card in the 1 / 2 / 3 / 4 column product grids
+const CARD_SIZES = '(min-width: 1024px) 25vw, (min-width: 768px) 33vw, (min-width: 640px) 50vw, 100vw';
 
 interface ProductCardProps {
   product: {
     id: string;
     title: string;
     image: string;
+    srcset?: Renditions;
+    placeholder?: string;
+    dominantColor?: string;
     price: number;
     sizes: string[];
     sizeIds?: string[];
@@ -18,6 +25,8 @@ interface ProductCardProps {
 
 const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
   const { addToCart } = useCart();
+  // The card rendition when it has been generated, else the original / external URL
+  const imageSrc = product.srcset?.card?.jpeg || product.image;
 
   const handleQuickAdd = (e: React.MouseEvent) => {
     e.preventDefault();
@@ -32,7 +41,7 @@ const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
     const cartProduct: CartProduct = {
       id: product.id,
       title: product.title,
-      image: product.image,
+      image: imageSrc,
       price: product.price,
       size: product.sizes[0],
       sizeId: defaultSizeId,
@@ -47,12 +56,30 @@ const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
     <div className="card group relative overflow-hidden rounded-lg">
       <Link to={`/product/${product.id}`} className="block">
         <div className="relative overflow-hidden">
-          {/* Product Image */}
-          <img 
-            src={product.image} 
-            alt={product.title} 
-            className="w-full h-80 object-cover transform transition-transform duration-500 group-hover:scale-105"
-          />
+          {/* Product Image - the tiny preview and dominant colour paint before it arrives */}
+          <picture>
+            {(['avif', 'webp'] as const).map(format => {
+              const srcSet = buildSrcSet(product.srcset, format);
+              return srcSet ? (
+                <source key={format} type={`image/${format}`} srcSet={srcSet} sizes={CARD_SIZES} />
+              ) : null;
+            })}
+            <img 
+              src={imageSrc} 
+              srcSet={buildSrcSet(product.srcset, 'jpeg')}
+              sizes={CARD_SIZES}
+              alt={product.title} 
+              loading="lazy"
+              decoding="async"
+              style={{
+                backgroundColor: product.dominantColor || undefined,
+                backgroundImage: product.placeholder ? `url(${product.placeholder})` : undefined,
+                backgroundSize: 'cover',
+                backgroundPosition: 'center',
+              }}
+              className="w-full h-80 object-cover transform transition-transform duration-500 group-hover:scale-105"
+            />
+          </picture>
           
           {/* Category Tag / Discount Label - With Glass Look */}
           <div className="absolute top-4 left-4">
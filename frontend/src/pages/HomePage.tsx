@@ -3,6 +3,7 @@ import { useLocation, Link } from 'react-router-dom';
 import ProductCard from '../components/products/ProductCard';
 import { ShoppingBag, Search } from 'lucide-react';
 import { API_BASE_URL } from '../data/ApiUrl';
+import { Renditions } from '../utils/images';
 
 // API base URL
 
@@ -21,6 +22,9 @@ interface ProductImage {
   id: string;
   image: string;
   image_url: string | null;
+  srcset?: Renditions;
+  placeholder?: string;
+  dominant_color?: string;
 }
 
 interface Product {
@@ -39,6 +43,9 @@ interface ProductCardProps {
   id: string;
   title: string;
   image: string;
+  srcset?: Renditions;
+  placeholder?: string;
+  dominantColor?: string;
   price: number;
   sizes: string[];
   sizeIds: string[];
@@ -230,6 +237,9 @@ const HomePage: React.FC = () => {
                 image: product.images && product.images.length > 0 
                   ? (product.images[0].image || product.images[0].image_url || '') 
                   : '',
+                srcset: product.images?.[0]?.srcset,
+                placeholder: product.images?.[0]?.placeholder,
+                dominantColor: product.images?.[0]?.dominant_color,
                 price: product.price,
                 sizes: product.size.map(s => s.size),
                 sizeIds: product.size.map(s => s.id),
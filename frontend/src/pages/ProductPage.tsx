@@ -5,6 +5,7 @@ import { useCart, CartProduct } from '../context/CartContext';
 import toast from 'react-hot-toast';
 import ProductCard from '../components/products/ProductCard';
 import { API_BASE_URL } from '../data/ApiUrl';
+import { Renditions } from '../utils/images';
 
 interface Size {
   id: string;
@@ -20,6 +21,9 @@ interface ProductImage {
   id: string;
   image: string;
   image_url: string | null;
+  srcset?: Renditions;
+  placeholder?: string;
+  dominant_color?: string;
 }
 
 interface Product {
@@ -37,6 +41,9 @@ interface ProductCardProps {
   id: string;
   title: string;
   image: string;
+  srcset?: Renditions;
+  placeholder?: string;
+  dominantColor?: string;
   price: number;
   sizes: string[];
   category: string;
@@ -164,6 +171,9 @@ const ProductPage: React.FC = () => {
       id: product.id,
       title: product.title,
       image: getProductImage(product),
+      srcset: product.images?.[0]?.srcset,
+      placeholder: product.images?.[0]?.placeholder,
+      dominantColor: product.images?.[0]?.dominant_color,
       price: product.price,
       sizes: product.size.map(s => s.size),
       category: product.category.name,
@@ -1,8 +1,12 @@
 import React, { useState, useEffect } from 'react';
-import { useLocation, Link } from 'react-router-dom';
+import { useLocation, useNavigate, Link } from 'react-router-dom';
 import ProductCard from '../components/products/ProductCard';
 import { Search } from 'lucide-react';
 import { API_BASE_URL } from '../data/ApiUrl';
+import { Renditions } from '../utils/images';
+import { fetchProductPage } from '../utils/api';
+
+const PAGE_SIZE = 24;
 
 // API base URL
 
@@ -21,6 +25,9 @@ interface ProductImage {
   id: string;
   image: string;
   image_url: string | null;
+  srcset?: Renditions;
+  placeholder?: string;
+  dominant_color?: string;
 }
 
 interface Product {
@@ -39,6 +46,9 @@ interface ProductCardProps {
   id: string;
   title: string;
   image: string;
+  srcset?: Renditions;
+  placeholder?: string;
+  dominantColor?: string;
   price: number;
   sizes: string[];
   category: string;
@@ -48,10 +58,13 @@ interface ProductCardProps {
 const Products: React.FC = () => {
   const [products, setProducts] = useState<Product[]>([]);
   const [categories, setCategories] = useState<CategoryData[]>([]);
-  const [filteredProducts, setFilteredProducts] = useState<Product[]>([]);
+  const [sizes, setSizes] = useState<Size[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [activeCategory, setActiveCategory] = useState<string>('all');
   const location = useLocation();
+  const navigate = useNavigate();
 
   // Fetch categories from API
   useEffect(() => {
@@ -74,73 +87,111 @@ const Products: React.FC = () => {
     fetchCategories();
   }, []);
 
-  // Fetch products from API
+  // Fetch sizes for the size filter
   useEffect(() => {
-    const fetchProducts = async () => {
-      setLoading(true);
+    const fetchSizes = async () => {
       try {
-        const response = await fetch(`${API_BASE_URL}api/products/`);
+        const response = await fetch(`${API_BASE_URL}api/sizes/`);
         const data = await response.json();
-        
-        if (data.status === 'success' && data.products) {
-          setProducts(data.products);
-          setFilteredProducts(data.products);
+
+        if (data.status === 'success' && data.sizes) {
+          setSizes(data.sizes);
         }
       } catch (error) {
-        console.error('Error fetching products:', error);
-      } finally {
-        setLoading(false);
+        console.error('Error fetching sizes:', error);
       }
     };
 
-    fetchProducts();
+    fetchSizes();
   }, []);
 
-  // Get search query and category from URL
-  useEffect(() => {
-    const searchParams = new URLSearchParams(location.search);
-    const searchQuery = searchParams.get('search');
-    const categoryParam = searchParams.get('category');
+  // Query params of /api/products/ that can be set through the page URL
+  const LIST_FILTERS = ['category', 'size', 'min_price', 'max_price', 'ordering'];
 
-    if (categoryParam) {
-      setActiveCategory(categoryParam);
-    } else {
-      setActiveCategory('all');
-    }
+  // Fetch one page of the current listing: full-text search results when
+  // ?search= is set, otherwise the filtered product list. For search the
+  // cursor is the next page number.
+  const fetchPage = async (search: string, cursor: string | null) => {
+    const params = new URLSearchParams(search);
+    const searchQuery = params.get('search');
 
     if (searchQuery) {
-      filterProducts(searchQuery, categoryParam || 'all');
-    } else if (categoryParam) {
-      filterByCategory(categoryParam);
-    } else {
-      setFilteredProducts(products);
+      const page = cursor ? Number(cursor) : 1;
+      const query = new URLSearchParams({ q: searchQuery, page: String(page), page_size: String(PAGE_SIZE) });
+      const response = await fetch(`${API_BASE_URL}api/products/search/?${query}`);
+      const data = await response.json();
+      if (!response.ok || data.status !== 'success') {
+        throw new Error(data.message || `API error: ${response.status}`);
+      }
+      return { products: data.products as Product[], nextCursor: data.has_more ? String(page + 1) : null };
     }
-  }, [location.search, products]);
-
-  const filterProducts = (searchQuery: string, category: string) => {
-    const filtered = products.filter(product => {
-      const matchesSearch = product.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                            (product.description && product.description.toLowerCase().includes(searchQuery.toLowerCase()));
-      
-      const matchesCategory = category === 'all' || product.category.id === category;
-      
-      return matchesSearch && matchesCategory;
+
+    const query = new URLSearchParams({ page_size: String(PAGE_SIZE) });
+    LIST_FILTERS.forEach(key => {
+      const value = params.get(key);
+      if (value) query.set(key, value);
     });
-    
-    setFilteredProducts(filtered);
+    return fetchProductPage<Product>(`api/products/?${query}`, cursor);
+  };
+
+  // Fetch the first page whenever the category, filters or search change
+  useEffect(() => {
+    let cancelled = false;
+    const searchParams = new URLSearchParams(location.search);
+    setActiveCategory(searchParams.get('category') || 'all');
+
+    const fetchProducts = async () => {
+      setLoading(true);
+      try {
+        const page = await fetchPage(location.search, null);
+        if (cancelled) return;
+        setProducts(page.products);
+        setNextCursor(page.nextCursor);
+      } catch (error) {
+        if (cancelled) return;
+        console.error('Error fetching products:', error);
+        setProducts([]);
+        setNextCursor(null);
+      } finally {
+        if (!cancelled) setLoading(false);
+      }
+    };
+
+    fetchProducts();
+    return () => {
+      cancelled = true;
+    };
+  }, [location.search]);
+
+  // Append the next page
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(location.search, nextCursor);
+      setProducts(prev => [...prev, ...page.products]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching more products:', error);
+    } finally {
+      setLoadingMore(false);
+    }
   };
 
-  const filterByCategory = (categoryId: string) => {
-    if (categoryId === 'all') {
-      setFilteredProducts(products);
+  // Update one filter in the URL, which refetches the list
+  const setFilter = (key: string, value: string) => {
+    const params = new URLSearchParams(location.search);
+    if (value) {
+      params.set(key, value);
     } else {
-      const filtered = products.filter(product => 
-        product.category.id === categoryId
-      );
-      setFilteredProducts(filtered);
+      params.delete(key);
     }
+    params.delete('search');
+    navigate(`/products${params.toString() ? `?${params}` : ''}`);
   };
 
+  const currentParams = new URLSearchParams(location.search);
+
   return (
     <div className="pt-24 pb-12 bg-teal-950 min-h-screen">
       <div className="container-custom">
@@ -165,6 +216,46 @@ const Products: React.FC = () => {
           </div>
         </div>
 
+        {/* Size, price and sort filters, applied by the API */}
+        <div className="mb-8 flex flex-wrap items-center justify-center gap-3">
+          <select
+            value={currentParams.get('size') || ''}
+            onChange={e => setFilter('size', e.target.value)}
+            className="bg-teal-800 text-white rounded-full px-4 py-2 text-sm"
+          >
+            <option value="">All sizes</option>
+            {sizes.map(size => (
+              <option key={size.id} value={size.id}>{size.size}</option>
+            ))}
+          </select>
+          <input
+            type="number"
+            min={0}
+            placeholder="Min price"
+            defaultValue={currentParams.get('min_price') || ''}
+            onBlur={e => setFilter('min_price', e.target.value)}
+            className="w-28 bg-teal-800 text-white rounded-full px-4 py-2 text-sm placeholder-gray-400"
+          />
+          <input
+            type="number"
+            min={0}
+            placeholder="Max price"
+            defaultValue={currentParams.get('max_price') || ''}
+            onBlur={e => setFilter('max_price', e.target.value)}
+            className="w-28 bg-teal-800 text-white rounded-full px-4 py-2 text-sm placeholder-gray-400"
+          />
+          <select
+            value={currentParams.get('ordering') || '-created_at'}
+            onChange={e => setFilter('ordering', e.target.value === '-created_at' ? '' : e.target.value)}
+            className="bg-teal-800 text-white rounded-full px-4 py-2 text-sm"
+          >
+            <option value="-created_at">Newest first</option>
+            <option value="created_at">Oldest first</option>
+            <option value="price">Price: low to high</option>
+            <option value="-price">Price: high to low</option>
+          </select>
+        </div>
+
         {/* Products Grid - Same design as HomePage */}
         <div className="mt-8">
           <h2 className="text-2xl font-bold text-white mb-8">
@@ -186,15 +277,18 @@ const Products: React.FC = () => {
                 </div>
               ))}
             </div>
-          ) : filteredProducts.length > 0 ? (
+          ) : products.length > 0 ? (
             <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
-              {filteredProducts.map(product => (
+              {products.map(product => (
                 <ProductCard key={product.id} product={{
                   id: product.id,
                   title: product.title,
                   image: product.images && product.images.length > 0 
                     ? (product.images[0].image || product.images[0].image_url || '') 
                     : '',
+                  srcset: product.images?.[0]?.srcset,
+                  placeholder: product.images?.[0]?.placeholder,
+                  dominantColor: product.images?.[0]?.dominant_color,
                   price: product.price,
                   sizes: product.size.map(s => s.size),
                   category: product.category.name,
@@ -202,7 +296,7 @@ const Products: React.FC = () => {
                 } as ProductCardProps} />
               ))}
             </div>
-          ) : (
+          ) : !nextCursor ? (
             <div className="text-center py-12">
               <Search className="mx-auto h-12 w-12 text-teal-600 mb-4" />
               <h3 className="text-xl font-medium text-white mb-2">No products found</h3>
@@ -210,6 +304,18 @@ const Products: React.FC = () => {
                 Try adjusting your search or filter to find what you're looking for.
               </p>
             </div>
+          ) : null}
+
+          {!loading && nextCursor && (
+            <div className="mt-10 text-center">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="px-6 py-3 rounded-full bg-gradient-to-r from-orange-500 to-amber-400 text-white font-medium disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load more products'}
+              </button>
+            </div>
           )}
         </div>
       </div>
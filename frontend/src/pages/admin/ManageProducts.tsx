@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { PlusCircle, Trash2, Edit, X, Upload, AlertCircle, Check } from 'lucide-react';
 import { useAuth } from '../../context/AuthContext';
 import { API_BASE_URL } from '../../data/ApiUrl';
+import { fetchProductPage } from '../../utils/api';
 import toast from 'react-hot-toast';
 
 interface CategoryData {
@@ -37,6 +38,8 @@ const ManageProducts: React.FC = () => {
   const { currentUser, authTokens } = useAuth();
   const [categories, setCategories] = useState<CategoryData[]>([]);
   const [products, setProducts] = useState<Product[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(false);
   const [formLoading, setFormLoading] = useState(false);
   const [error, setError] = useState('');
@@ -114,17 +117,13 @@ const ManageProducts: React.FC = () => {
     const fetchProducts = async () => {
       setLoading(true);
       try {
-        const response = await fetch(`${API_BASE_URL}api/products/`, {
+        const page = await fetchProductPage<Product>('api/products/?page_size=50', null, {
           headers: {
             'Authorization': `Bearer ${authTokens?.access}`,
           }
         });
-        
-        const data = await response.json();
-        
-        if (data.status === 'success' && data.products) {
-          setProducts(data.products);
-        }
+        setProducts(page.products);
+        setNextCursor(page.nextCursor);
       } catch (error) {
         console.error('Error fetching products:', error);
         toast.error('Failed to load products');
@@ -138,6 +137,24 @@ const ManageProducts: React.FC = () => {
     }
   }, [authTokens]);
 
+  // Append the next page of products
+  const loadMoreProducts = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchProductPage<Product>('api/products/?page_size=50', nextCursor, {
+        headers: { 'Authorization': `Bearer ${authTokens?.access}` },
+      });
+      setProducts(prev => [...prev, ...page.products]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching more products:', error);
+      toast.error('Failed to load more products');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Add effect to fetch sizes from API
   useEffect(() => {
     const fetchSizes = async () => {
@@ -486,13 +503,11 @@ const ManageProducts: React.FC = () => {
           toast.error(`Failed to ${isEditMode ? 'update' : 'create'} product. Please try again.`);
         } else {
           // Refresh products list
-          const productsResponse = await fetch(`${API_BASE_URL}api/products/`, {
+          const page = await fetchProductPage<Product>('api/products/?page_size=50', null, {
             headers: { 'Authorization': `Bearer ${authTokens?.access}` },
           });
-          const productsData = await productsResponse.json();
-          if (productsData.status === 'success' && productsData.products) {
-            setProducts(productsData.products);
-          }
+          setProducts(page.products);
+          setNextCursor(page.nextCursor);
           resetForm();
           setShowModal(false);
           toast.success(`Product ${isEditMode ? 'updated' : 'created'} successfully!`);
@@ -1274,6 +1289,18 @@ const ManageProducts: React.FC = () => {
                 ))}
               </div>
             )}
+
+            {!loading && nextCursor && (
+              <div className="mt-6 text-center">
+                <button
+                  onClick={loadMoreProducts}
+                  disabled={loadingMore}
+                  className="btn btn-secondary text-sm"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more products'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>
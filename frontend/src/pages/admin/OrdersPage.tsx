@@ -52,6 +52,9 @@ const OrdersPage: React.FC = () => {
   const { authTokens } = useAuth();
   const [orders, setOrders] = useState<Order[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [statusFilter, setStatusFilter] = useState<'all' | 'true' | 'false'>('all');
   const [expandedOrder, setExpandedOrder] = useState<string | null>(null);
   const [isUpdating, setIsUpdating] = useState<string | null>(null);
   const [showEditModal, setShowEditModal] = useState(false);
@@ -67,12 +70,24 @@ const OrdersPage: React.FC = () => {
   // Fetch orders
   useEffect(() => {
     fetchOrders();
-  }, [authTokens]);
+  }, [authTokens, statusFilter]);
 
-  const fetchOrders = async () => {
-    setLoading(true);
+  // Orders come one page at a time; pass the previous next_cursor to append the next page
+  const fetchOrders = async (cursor: string | null = null) => {
+    if (cursor) {
+      setLoadingMore(true);
+    } else {
+      setLoading(true);
+    }
     try {
-      const response = await fetch(`${API_BASE_URL}api/admin/orders/`, {
+      const params = new URLSearchParams({ page_size: '50' });
+      if (statusFilter !== 'all') {
+        params.set('is_confirmed', statusFilter);
+      }
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const response = await fetch(`${API_BASE_URL}api/admin/orders/?${params}`, {
         headers: {
           'Authorization': `Bearer ${authTokens?.access}`,
         }
@@ -85,7 +100,8 @@ const OrdersPage: React.FC = () => {
       const data = await response.json();
       
       if (data.status && data.data) {
-        setOrders(data.data);
+        setOrders(prevOrders => cursor ? [...prevOrders, ...data.data] : data.data);
+        setNextCursor(data.next_cursor ?? null);
       } else {
         console.error('Unexpected API response:', data);
         toast.error('Failed to load orders');
@@ -95,6 +111,7 @@ const OrdersPage: React.FC = () => {
       toast.error('Failed to load orders');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -399,12 +416,23 @@ const OrdersPage: React.FC = () => {
       <div className="container-custom max-w-6xl">
         <div className="flex justify-between items-center mb-6">
           <h1 className="text-2xl font-bold text-white">Manage Orders</h1>
-          <button
-            onClick={() => fetchOrders()}
-            className="btn btn-primary text-sm"
-          >
-            Refresh Orders
-          </button>
+          <div className="flex items-center gap-3">
+            <select
+              value={statusFilter}
+              onChange={(e) => setStatusFilter(e.target.value as 'all' | 'true' | 'false')}
+              className="bg-teal-900 text-white border border-teal-700 rounded-md px-3 py-2 text-sm"
+            >
+              <option value="all">All orders</option>
+              <option value="false">Pending</option>
+              <option value="true">Confirmed</option>
+            </select>
+            <button
+              onClick={() => fetchOrders()}
+              className="btn btn-primary text-sm"
+            >
+              Refresh Orders
+            </button>
+          </div>
         </div>
         
         {loading ? (
@@ -576,6 +604,17 @@ const OrdersPage: React.FC = () => {
                   </tbody>
                 </table>
               </div>
+              {nextCursor && (
+                <div className="mt-6 text-center">
+                  <button
+                    onClick={() => fetchOrders(nextCursor)}
+                    disabled={loadingMore}
+                    className="btn btn-secondary text-sm"
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more orders'}
+                  </button>
+                </div>
+              )}
             </div>
           </div>
         ) : (
@@ -127,4 +127,35 @@ export async function apiDelete<T>(
   }
 
   return response.json();
-} 
\ No newline at end of file
+}
+
+export interface ProductPage<T> {
+  products: T[];
+  nextCursor: string | null;
+}
+
+/**
+ * Fetch one page of the cursor-paginated product list
+ * @param endpoint - Product list endpoint, optionally with query params
+ * @param cursor - next_cursor returned with the previous page, null for the first page
+ * @param options - Fetch options
+ * @returns Promise with the products of the page and the cursor of the next one
+ */
+export async function fetchProductPage<T>(
+  endpoint: string,
+  cursor: string | null = null,
+  options: RequestInit = {}
+): Promise<ProductPage<T>> {
+  const separator = endpoint.includes('?') ? '&' : '?';
+  const url = cursor
+    ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}`
+    : endpoint;
+  const response = await fetch(`${API_BASE_URL}${url}`, options);
+  const data = await response.json();
+
+  if (!response.ok || data.status !== 'success' || !data.products) {
+    throw new Error(data.message || `API error: ${response.status}`);
+  }
+
+  return { products: data.products, nextCursor: data.next_cursor ?? null };
+}
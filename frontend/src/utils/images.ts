@@ -0,0 +1,32 @@
+/**
+ * One responsive rendition of a product image, as returned in `srcset`
+ * by the API: pixel size plus a URL per encoded format
+ */
+export interface Rendition {
+  width: number;
+  height: number;
+  jpeg?: string;
+  webp?: string;
+  avif?: string;
+}
+
+/** Renditions keyed by name (thumbnail, card, detail) */
+export type Renditions = Record<string, Rendition>;
+
+export type ImageFormat = 'jpeg' | 'webp' | 'avif';
+
+/**
+ * Build an HTML srcset ("url 160w, url 480w, ...") from every rendition
+ * available in the given format
+ * @param renditions - The image's `srcset` map from the API
+ * @param format - Encoded format to list
+ * @returns The srcset string, or undefined when there is no such rendition
+ */
+export function buildSrcSet(renditions: Renditions | undefined, format: ImageFormat): string | undefined {
+  if (!renditions) return undefined;
+  const entries = Object.values(renditions)
+    .filter(rendition => rendition[format])
+    .sort((a, b) => a.width - b.width)
+    .map(rendition => `${rendition[format]} ${rendition.width}w`);
+  return entries.length > 0 ? entries.join(', ') : undefined;
+}